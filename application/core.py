@@ -10,6 +10,25 @@ import async2rewrite
 PATH = os.path.dirname(os.path.realpath(__file__))
 
 
+def token_ranges(text, line, lexer):
+    """Lexes text starting at the given line of a Text widget.
+
+    Yields ``(token, start, end)`` with the Text indexes of every token.
+    """
+    column = 0
+    for token, content in lex(text, lexer):
+        start = '{}.{}'.format(line, column)
+
+        newlines = content.count('\n')
+        if newlines:
+            line += newlines
+            column = len(content) - content.rfind('\n') - 1
+        else:
+            column += len(content)
+
+        yield str(token), start, '{}.{}'.format(line, column)
+
+
 def get_window_info(window, *, main_menu=False, custom_wh=None):
     """Fetches the center of the screen (according to x and y).
     """
@@ -194,50 +213,148 @@ class Snippet(tk.Toplevel):
                 self.input_text.insert(tk.END, text)
         else:
             self.input_text.insert(tk.END, "\n\n#-- Rewrite Conversion:\n\n{}".format(conversion))
-            self.input_text.highlight()
+
+        # Only the inserted lines are highlighted.
+        self.input_text.highlight()
 
 
 class SyntaxText(tk.Text):
     """Custom Text with syntax highlighting.
+
+    Only the lines edited since the last highlight are lexed again, once
+    typing pauses for ``delay`` milliseconds.
     """
+
+    # Colours of the tokens that are highlighted
+    styles = {
+        "Token.Comment.Single": "red",
+        "Token.Keyword": "orange",
+        "Token.Keyword.Constant": "orange",
+        "Token.Keyword.Namespace": "orange",
+        "Token.Literal.String.Affix": "green",
+        "Token.Literal.String.Double": "green",
+        "Token.Literal.String.Doc": "green",
+        "Token.Literal.String.Single": "green",
+        "Token.Name.Builtin": "purple",
+        "Token.Name.Class": "blue",
+        "Token.Name.Exception": "purple",
+        "Token.Name.Function": "blue",
+        "Token.Operator.Word": "green",
+    }
+
+    # Shared by every SyntaxText, leading and trailing newlines are kept
+    # so token positions match the text.
+    lexer = Python3Lexer(stripnl=False)
+
+    delay = 150
+
     def __init__(self, master):
         super().__init__(master)
 
         # Configure tags for syntax highlighting
-        self.tag_configure("Token.Comment.Single", foreground="red")
-        self.tag_configure("Token.Keyword", foreground="orange")
-        self.tag_configure("Token.Keyword.Constant", foreground="orange")
-        self.tag_configure("Token.Keyword.Namespace", foreground="orange")
-        self.tag_configure("Token.Literal.String.Affix", foreground="green")
-        self.tag_configure("Token.Literal.String.Double", foreground="green")
-        self.tag_configure("Token.Literal.String.Doc", foreground="green")
-        self.tag_configure("Token.Literal.String.Single", foreground="green")
-        self.tag_configure("Token.Name.Builtin", foreground="purple")
-        self.tag_configure("Token.Name.Class", foreground="blue")
-        self.tag_configure("Token.Name.Exception", foreground="purple")
-        self.tag_configure("Token.Name.Function", foreground="blue")
-        self.tag_configure("Token.Operator.Word", foreground="green")
+        for token, colour in self.styles.items():
+            self.tag_configure(token, foreground=colour)
+
+        # Whether the "dirty.first" and "dirty.last" marks hold the text
+        # edited since the last highlight, and the highlight waiting for
+        # typing to pause
+        self.dirty = False
+        self.pending = None
+
+        # Every edit, typed, pasted, dropped or made from code, goes through
+        # the widget's Tcl command, so it is wrapped to see them all.
+        self.widget_command = self._w + '_widget'
+        self.tk.call('rename', self._w, self.widget_command)
+        self.tk.createcommand(self._w, self.dispatch)
 
         # Override events
         self.bind('<Tab>', self.replace_tabs)
-        self.bind('<KeyRelease>', self.highlight)
 
-    def highlight(self, event=None):
-        """Does syntax highlighting.
+    def destroy(self):
+        super().destroy()
+        self.tk.deletecommand(self._w)
+
+    def dispatch(self, command, *args):
+        """Runs a command of the wrapped widget, marking the text it edits."""
+        if command in ('insert', 'delete', 'replace') and args:
+            first = self.tk.call(self.widget_command, 'index', args[0])
+            last = args[1] if command == 'replace' else args[-1] if command == 'delete' else first
+            self.invalidate(first, self.tk.call(self.widget_command, 'index', last))
+        elif command == 'edit' and args and args[0] in ('undo', 'redo'):
+            self.invalidate('1.0', 'end-1c')
+
+        return self.tk.call((self.widget_command, command) + args)
+
+    def line(self, index):
+        """Line number of a Text index."""
+        return int(self.index(index).split('.')[0])
+
+    def invalidate(self, first, last=None):
+        """Adds text to be highlighted again, once typing pauses.
+
+        The range is kept in marks, so it moves along with edits around it.
+        Text inserted at its end goes in it, as "dirty.last" has right gravity.
         """
-        data = self.get("1.0", "end-1c")
-        if data != '':
-            # Add tags
-            self.mark_set("range_start", "1.0")
-
-            # Run lexer for syntax highlighter
-            for token, content in lex(data, Python3Lexer()):
-                self.mark_set("range_end", "range_start + {}c".format(len(content)))
-                self.tag_add(str(token), "range_start", "range_end")
-                self.mark_set("range_start", "range_end")
-            del event
+        last = first if last is None else last
+        if self.compare(first, '>', last):
+            first, last = last, first
+
+        if not self.dirty:
+            self.mark_set('dirty.first', first)
+            self.mark_gravity('dirty.first', tk.LEFT)
+            self.mark_set('dirty.last', last)
+            self.mark_gravity('dirty.last', tk.RIGHT)
+            self.dirty = True
         else:
+            if self.compare(first, '<', 'dirty.first'):
+                self.mark_set('dirty.first', first)
+            if self.compare(last, '>', 'dirty.last'):
+                self.mark_set('dirty.last', last)
+
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+        self.pending = self.after(self.delay, self.highlight)
+
+    def in_string(self, index):
+        return any(tag.startswith('Token.Literal.String') for tag in self.tag_names(index))
+
+    def highlight(self, event=None):
+        """Does syntax highlighting of the lines changed since the last time.
+        """
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+            self.pending = None
+
+        if not self.dirty:
             return
+        first, last = self.line('dirty.first'), self.line('dirty.last')
+        self.mark_unset('dirty.first', 'dirty.last')
+        self.dirty = False
+
+        # An edit inside a multi-line string is lexed from the string's start.
+        while first > 1 and self.in_string('{}.0 - 1c'.format(first)):
+            first -= 1
+
+        start = '{}.0'.format(first)
+        end = '{}.0 lineend'.format(last)
+        data = self.get(start, end)
+
+        # A string that used to go on past the edit, or that now does,
+        # changes the highlighting up to the end.
+        if self.in_string(end) or data.count('"""') % 2 or data.count("'''") % 2:
+            end = 'end-1c'
+            data = self.get(start, end)
+
+        # Remove the stale tags
+        for token in self.styles:
+            self.tag_remove(token, start, end)
+
+        if data == '':
+            return
+
+        for token, token_start, token_end in token_ranges(data, first, self.lexer):
+            if token in self.styles:
+                self.tag_add(token, token_start, token_end)
 
     def replace_tabs(self, event=None):
         """Replace tabs with spaces."""
@@ -1,10 +1,13 @@
 import platform
 import os
-from application import core
+
+# The GUI runs in its own process, so only its path is needed here, importing
+# it would load tkinter and pygments for nothing.
+core_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'core.py')
 
 
 def setup():
     if platform.system() == 'Linux':
-        os.system('nohup {} &'.format(os.path.realpath(core.__file__)))
+        os.system('nohup {} &'.format(core_path))
     elif platform.system() == 'Windows':
-        os.system('start pythonw {}'.format(os.path.realpath(core.__file__)))
+        os.system('start pythonw {}'.format(core_path))
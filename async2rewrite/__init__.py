@@ -10,4 +10,43 @@ __version__ = '0.1.9'
 __copyright__ = 'Copyright 2017 TheTrain2000'
 __license__ = 'MIT'
 
-from .main import *
+import sys
+import importlib
+
+__all__ = ['from_file', 'from_file_async', 'from_text', 'from_text_async', 'get_result', 'iter_files',
+           'iter_files_async', 'process_file', 'collect_files', 'needs_conversion', 'ConversionCache',
+           'ConversionError', 'DiscordTransformer']
+
+
+# The asyncio API is kept out of main, it needs Python 3.6+.
+async_names = ('from_text_async', 'from_file_async', 'iter_files_async')
+
+
+def __getattr__(name):
+    # Everything in main is available from the package, but it is only
+    # imported once it is used, so importing the package is fast.
+    module = importlib.import_module('.aio' if name in async_names else '.main', __name__)
+    try:
+        return getattr(module, name)
+    except AttributeError:
+        pass
+
+    # Submodules, like async2rewrite.transformers, that weren't imported yet.
+    try:
+        return importlib.import_module('.' + name, __name__)
+    except ModuleNotFoundError as e:
+        if e.name != '{}.{}'.format(__name__, name):
+            raise
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name)) from None
+
+
+def __dir__():
+    return sorted(set(globals()) | set(async_names) | set(dir(importlib.import_module('.main', __name__))))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ is only called on Python 3.7+, import everything up front.
+    from .main import *
+
+    if sys.version_info >= (3, 6):
+        from .aio import from_file_async, from_text_async, iter_files_async
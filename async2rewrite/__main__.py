@@ -1,9 +1,12 @@
 import os
-import platform
+import sys
+import json
 import argparse
-import difflib
+from collections import Counter
 
-from async2rewrite.main import from_file
+from async2rewrite.main import iter_files, collect_files, ConversionCache
+from async2rewrite.manifest import Journal, Manifest, DEFAULT_JOURNAL, DEFAULT_MANIFEST, git_changed_files
+from async2rewrite.profiling import StageTimer
 
 parser = argparse.ArgumentParser(description='Automatically convert discord.py async branch code to rewrite.')
 
@@ -14,34 +17,350 @@ parser.add_argument('--print', dest='print', action='store_true',
                     help='print the output instead of writing for a file (default: false)')
 parser.add_argument('--diff', dest='diff', action='store_true',
                     help='create a diff file for every file converted (default: false)')
+parser.add_argument('--patch', dest='patch', action='store', default=None, metavar='FILE',
+                    help='write the changes to every file into a single patch for `git apply`, instead of '
+                         'writing converted files')
+parser.add_argument('--context', dest='context', action='store', type=int, default=3, metavar='N',
+                    help='lines of context around each change in diffs and patches (default: 3)')
 parser.add_argument('--gui', dest='gui', action='store_true',
                     help='launch the GUI extension of async2rewrite (default: true)')
+parser.add_argument('--exclude', dest='exclude', action='append', default=[], metavar='PATTERN',
+                    help='skip files and directories matching this .gitignore-style glob, can be repeated')
+parser.add_argument('--include', dest='include', action='append', default=[], metavar='PATTERN',
+                    help='only convert files matching this .gitignore-style glob, or in a directory that does, '
+                         'can be repeated')
+parser.add_argument('--no-default-excludes', dest='default_excludes', action='store_false',
+                    help='also walk directories skipped by default, such as .git, venv, __pycache__, '
+                         'site-packages and build')
+parser.add_argument('--jobs', '-j', dest='jobs', action='store', type=int, default=1,
+                    help='number of processes to convert files with, 0 for one per CPU (default: 1)')
+parser.add_argument('--split', dest='split', action='store', nargs='?', type=int, const=2000, default=None,
+                    metavar='LINES', help='convert files longer than LINES a group of top-level definitions at a '
+                                          'time, spread over the --jobs processes (default: 2000 when given)')
+parser.add_argument('--cache', dest='cache', action='store', nargs='?', const=True, default=None, metavar='DIR',
+                    help='reuse output for unchanged files, stored in DIR (default: ~/.cache/async2rewrite)')
+parser.add_argument('--cache-size', dest='cache_size', action='store', type=int, default=128, metavar='MB',
+                    help='evict old cache entries beyond this many megabytes (default: 128)')
+parser.add_argument('--incremental', dest='incremental', action='store', nargs='?', const=DEFAULT_MANIFEST,
+                    default=None, metavar='MANIFEST',
+                    help='only convert files changed since the run recorded in MANIFEST '
+                         '(default: \'{}\')'.format(DEFAULT_MANIFEST))
+parser.add_argument('--journal', dest='journal', action='store', nargs='?', const=DEFAULT_JOURNAL, default=None,
+                    metavar='JOURNAL', help='record whether each file was converted, skipped or failed in JOURNAL '
+                                            'as the run goes (default: \'{}\')'.format(DEFAULT_JOURNAL))
+parser.add_argument('--resume', dest='resume', action='store_true',
+                    help='continue the run recorded in the --journal, leaving out the files it already converted '
+                         'or skipped (default: false)')
+parser.add_argument('--git-changed', dest='git_changed', action='store', nargs='?', const=True, default=None,
+                    metavar='REF', help='only convert files listed by `git diff --name-only [REF]`')
+parser.add_argument('--backend', dest='backend', action='store', choices=['unparse', 'patch'], default='unparse',
+                    help='regenerate the whole file (unparse) or only the edited regions, keeping formatting '
+                         'and comments (patch) (default: unparse)')
+parser.add_argument('--no-validate', dest='validate', action='store_false',
+                    help='don\'t parse the converted code again to check that it is valid (default: false)')
+parser.add_argument('--scan', dest='scan', action='store_true',
+                    help='only report the changes that would be made, without writing anything. Exits with 1 when '
+                         'changes or warnings are found and 2 when a file can\'t be read (default: false)')
+parser.add_argument('--json', dest='json', action='store_true',
+                    help='print the --scan report as JSON (default: false)')
+parser.add_argument('--profile', dest='profile', action='store_true',
+                    help='print the time spent in each stage of the conversion, in total and for the slowest '
+                         'files, to stderr. Disables --cache (default: false)')
+parser.add_argument('--profile-rules', dest='profile_rules', action='store_true',
+                    help='like --profile, also reporting the nodes each rule examined and rewrote and the time '
+                         'it took (default: false)')
+parser.add_argument('--serve', dest='serve', action='store', nargs='?', const=True, default=None,
+                    metavar='ADDRESS', help='run a daemon converting files for --connect, with --jobs warm worker '
+                                            'processes, on a unix socket path or loopback host:port (default: a socket in '
+                                            '$XDG_RUNTIME_DIR or the temporary directory)')
+parser.add_argument('--connect', dest='connect', action='store', nargs='?', const=True, default=None,
+                    metavar='ADDRESS', help='convert the files in the daemon started with --serve, converting them '
+                                            'here if none is running')
+parser.add_argument('--stop-daemon', dest='stop_daemon', action='store', nargs='?', const=True, default=None,
+                    metavar='ADDRESS', help='stop the daemon started with --serve')
 parser.set_defaults(print=False, interactive=False, diff=False, gui=True)
 
-results = parser.parse_args()
 
-if not (results.print or results.diff):
-    from application.launcher import setup
-    setup()
-else:
-    results.gui = False
+def selection(results):
+    """The options selecting which files to convert."""
+    return {'exclude': results.exclude, 'include': results.include, 'default_excludes': results.default_excludes}
 
-converted = from_file(*results.paths, interactive=results.interactive)
-d = difflib.Differ()
 
-for key, value in converted.items():
-    if not results.print:
-        with open(key + results.suffix, 'w', encoding='utf-8') as f:
-            f.write(value)
+def scan(results):
+    """Analyze every file and print a report of the changes to be made."""
+    files = {}
+    errors = {}
+    totals = Counter()
+    warning_count = 0
+    scanned = 0
+
+    for key, value in iter_files(*results.paths, scan=True, workers=results.jobs, return_exceptions=True,
+                                 **selection(results)):
+        scanned += 1
+        if isinstance(value, Exception):
+            errors[key] = '{}: {}'.format(type(value).__name__, value)
+            if not results.json:
+                print('{}: error: {}'.format(key, errors[key]), file=sys.stderr)
+            continue
+
+        if not (value.counts or value.warnings):
+            continue
+
+        files[key] = {'changes': dict(value.counts),
+                      'warnings': [{'code': d.code, 'line': d.line, 'col': d.col, 'message': d.message}
+                                   for d in value.warnings]}
+        totals.update(value.counts)
+        warning_count += len(value.warnings)
+
+        if not results.json:
+            rules = ', '.join('{}: {}'.format(rule, count) for rule, count in value.counts.most_common())
+            print('{}: {} changes ({})'.format(key, sum(value.counts.values()), rules))
+            for d in value.warnings:
+                print('{}:{}:{}: warning: {} ({})'.format(key, d.line, d.col, d.message, d.code))
+
+    if results.json:
+        print(json.dumps({'files': files, 'totals': dict(totals), 'warnings': warning_count, 'errors': errors,
+                          'scanned': scanned}, indent=2, sort_keys=True))
     else:
-        print('{}\n{}'.format(key + results.suffix, value))
+        print('{} changes and {} warnings in {} of {} files'.format(sum(totals.values()), warning_count,
+                                                                   len(files), scanned))
+        for rule, count in totals.most_common():
+            print('    {}: {}'.format(rule, count))
+
+    if errors:
+        return 2
+    return 1 if files else 0
+
+
+def print_profile(timers, limit=20):
+    """Print the time spent per stage, in total and for the ``limit`` slowest files."""
+    total = StageTimer()
+    for _, timer in timers:
+        total.update(timer)
+
+    def breakdown(timer):
+        stages = sorted(timer.stages.items(), key=lambda stage: stage[1], reverse=True)
+        return ', '.join('{} {:.1f} ms'.format(name, seconds * 1e3) for name, seconds in stages)
+
+    print('profile: {} files in {:.1f} ms'.format(len(timers), total.total * 1e3), file=sys.stderr)
+    for name, seconds in sorted(total.stages.items(), key=lambda stage: stage[1], reverse=True):
+        share = seconds / total.total * 100 if total.total else 0
+        print('    {:<10} {:10.1f} ms {:6.1f}%'.format(name, seconds * 1e3, share), file=sys.stderr)
+
+    slowest = sorted(timers, key=lambda item: item[1].total, reverse=True)[:limit]
+    if slowest:
+        print('slowest files:', file=sys.stderr)
+    for path, timer in slowest:
+        print('    {}: {:.1f} ms ({})'.format(path, timer.total * 1e3, breakdown(timer)), file=sys.stderr)
+
+    if total.rules is not None:
+        print('rules:', file=sys.stderr)
+        print('    {:<32} {:>9} {:>9} {:>10} {:>10}'.format('rule', 'examined', 'rewritten', 'ms', 'us/node'),
+              file=sys.stderr)
+        for rule, stats in total.rules.most_expensive():
+            print('    {:<32} {:9} {:9} {:10.1f} {:10.2f}'.format(rule, stats.examined, stats.rewritten,
+                                                               stats.seconds * 1e3,
+                                                               stats.seconds * 1e6 / stats.examined),
+                  file=sys.stderr)
+
+
+def main():
+    results = parser.parse_args()
+
+    if results.scan:
+        return scan(results)
+
+    cache = None
+    if results.cache:
+        cache = ConversionCache(None if results.cache is True else results.cache,
+                                max_size=results.cache_size * 1024 * 1024)
+
+    if results.serve or results.connect or results.stop_daemon:
+        from async2rewrite.daemon import DaemonClient, DaemonError, serve as serve_daemon
+
+    if results.serve:
+        try:
+            serve_daemon(None if results.serve is True else results.serve, workers=results.jobs, cache=cache)
+        except DaemonError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    if results.stop_daemon:
+        try:
+            DaemonClient(None if results.stop_daemon is True else results.stop_daemon).shutdown()
+        except DaemonError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    if not (results.print or results.diff or results.patch):
+        from application.launcher import setup
+        setup()
+    else:
+        results.gui = False
+
+    manifest = Manifest(results.incremental) if results.incremental else None
+
+    journal = None
+    if results.journal or results.resume:
+        journal = Journal(results.journal or DEFAULT_JOURNAL, resume=results.resume)
+    resuming = journal is not None and bool(journal.files)
+
+    changed = None
+    if results.git_changed:
+        changed = git_changed_files(None if results.git_changed is True else results.git_changed)
+
+    def outputs(path):
+        if results.print or results.patch:
+            return []
+        if results.diff:
+            return [path + results.suffix, path + '.diff']
+        return [path + results.suffix]
+
+    def wanted(path):
+        # Never convert our own output from a previous run.
+        if path.endswith(results.suffix):
+            return False
+        if changed is not None and os.path.normpath(os.path.relpath(path)) not in changed:
+            return False
+        if resuming and journal.is_done(path):
+            return False
+        return manifest is None or not manifest.is_current(path, outputs(path))
+
+    paths = results.paths
+    select = selection(results)
+    if manifest is not None or changed is not None or resuming:
+        paths = [path for path in collect_files(*paths, **select) if wanted(path)]
+        select = {}
+
+    if results.diff or results.patch:
+        from async2rewrite.diff import unified_diff
+
+    status = 0
+    timers = []
+    profiling = False
+    warning_count = 0
+
+    converted = None
+    if results.connect:
+        try:
+            client = DaemonClient(None if results.connect is True else results.connect)
+        except DaemonError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+        if client.ping():
+            converted = client.iter_files(*paths, interactive=results.interactive, validate=results.validate,
+                                          backend=results.backend, split=results.split, diagnostics=True,
+                                          return_exceptions=True, **select)
+        else:
+            print('no daemon listening on {}, converting here'.format(client.address), file=sys.stderr)
+
+    if converted is None:
+        profiling = results.profile or results.profile_rules
+        converted = iter_files(*paths, interactive=results.interactive, validate=results.validate,
+                               backend=results.backend, split=results.split, workers=results.jobs, cache=cache,
+                               profile=results.profile, profile_rules=results.profile_rules,
+                               diagnostics=True, return_exceptions=True, **select)
+
+    # Diffs are streamed into the patch as files are converted. A resumed
+    # run adds to the patch of the run it continues.
+    patch = None
+    if results.patch:
+        patch = open(results.patch, 'a' if resuming else 'w', encoding='utf-8', newline='')
+
+    def write(key, value):
+        """Write out the result for a file, returning its status for the journal."""
+        if results.print:
+            print('{}\n{}'.format(key + results.suffix, value))
+            if manifest is not None:
+                manifest.record(key, [], value)
+            return 'ok'
 
-    if results.diff:
         with open(key, 'r', encoding='utf-8') as f:
-            original = f.readlines()
-        with open(key + results.suffix, 'r', encoding='utf-8') as f:
-            new = f.readlines()
+            original = f.read()
+
+        if value == original:
+            # Nothing to convert, leave the outputs (and their timestamps) alone.
+            if manifest is not None:
+                manifest.record(key, [], value, unchanged=True)
+            return 'skipped'
+
+        if patch is not None:
+            # The patch has to match the file byte for byte, line endings included.
+            with open(key, 'r', encoding='utf-8', newline='') as f:
+                original = f.read()
+            if '\r\n' in original:
+                value = value.replace('\n', '\r\n')
+
+            patch.writelines(unified_diff(original, value, key, context=results.context))
+            patch.flush()
+            if manifest is not None:
+                manifest.record(key, [], value)
+            return 'ok'
+
+        with open(key + results.suffix, 'w', encoding='utf-8') as f:
+            f.write(value)
+
+        if results.diff:
+            with open(key + '.diff', 'w', encoding='utf-8') as f:
+                f.writelines(unified_diff(original, value, key, context=results.context))
+
+        if manifest is not None:
+            manifest.record(key, outputs(key), value)
+        return 'ok'
+
+    try:
+        # Each file is written (and diffed) as soon as it is converted, so
+        # nothing but the current file is kept around.
+        for key, value in converted:
+            if not isinstance(value, Exception):
+                if profiling:
+                    value, timer = value
+                    timers.append((key, timer))
+
+                value, found = value
+                for d in found:
+                    print('{}:{}:{}: warning: {} ({})'.format(key, d.line, d.col, d.message, d.code),
+                          file=sys.stderr)
+                warning_count += len(found)
+
+                # A file that can't be written fails on its own, like one
+                # that can't be converted.
+                try:
+                    outcome = write(key, value)
+                except Exception as e:
+                    value = e
+
+            if isinstance(value, Exception):
+                error = '{}: {}'.format(type(value).__name__, value)
+                print('{}: {}'.format(key, error), file=sys.stderr)
+                if manifest is not None:
+                    manifest.forget(key)
+                if journal is not None:
+                    journal.record(key, 'failed', error)
+                status = 1
+                continue
+
+            if journal is not None:
+                journal.record(key, outcome)
+    finally:
+        if patch is not None:
+            patch.close()
+        if manifest is not None:
+            manifest.save()
+        if journal is not None:
+            journal.close()
+
+    if warning_count:
+        print('{} changes to be made by hand'.format(warning_count), file=sys.stderr)
+
+    if profiling:
+        print_profile(timers)
+
+    return status
+
 
-        differences = d.compare(original, new)
-        with open(key + '.diff', 'w', encoding='utf-8') as f:
-            f.writelines(differences)
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import os
+import asyncio
+from collections import deque
+from functools import partial
+
+from .cache import resolve_cache
+from .main import ConversionError, collect_files, get_result, process_file, selection
+
+
+async def from_text_async(text, executor=None, **kwargs):
+    """Coroutine version of from_text.
+
+    The conversion runs in ``executor`` (the event loop's default executor
+    when None), so the event loop keeps running meanwhile.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, partial(get_result, text, **kwargs))
+
+
+async def iter_files_async(*files, executor=None, concurrency=None, return_exceptions=False, **kwargs):
+    """Asynchronous generator version of iter_files.
+
+    Files are read and converted in ``executor`` (the event loop's default
+    executor when None), with at most ``concurrency`` files (default: one
+    per CPU) in flight at once. ``(path, result)`` pairs are yielded in the
+    order the files were found.
+
+    Cancelling the consumer cancels every conversion that hasn't started
+    yet. Ones already running in the executor finish, but are discarded.
+    """
+    loop = asyncio.get_event_loop()
+    limit = concurrency or os.cpu_count() or 1
+
+    if kwargs.get('cache'):
+        kwargs['cache'] = resolve_cache(kwargs['cache'])
+
+    # Walking the tree is blocking I/O as well.
+    paths = await loop.run_in_executor(None, list, collect_files(*files, **selection(kwargs)))
+
+    pending = deque()
+
+    async def finish(path, future):
+        try:
+            result = await future
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            result = e
+
+        return path, result
+
+    try:
+        for path in paths:
+            pending.append((path, loop.run_in_executor(executor, partial(process_file, path, **kwargs))))
+            if len(pending) >= limit:
+                yield await finish(*pending.popleft())
+
+        while pending:
+            yield await finish(*pending.popleft())
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+async def from_file_async(*files, **kwargs):
+    """Coroutine version of from_file, see iter_files_async for the options.
+
+    Failures are collected per file into a ConversionError.
+    """
+    res = {}
+    errors = {}
+
+    async for path, result in iter_files_async(*files, return_exceptions=True, **kwargs):
+        if isinstance(result, Exception):
+            errors[path] = result
+        else:
+            res[path] = result
+
+    if errors:
+        raise ConversionError(errors, res)
+
+    return res
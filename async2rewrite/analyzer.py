@@ -0,0 +1,160 @@
+from collections import Counter
+import ast
+
+from .transformers import (Diagnostic, DiscordTransformer, ctx_shortcuts, ext_events, guild_events, guild_name,
+                           property_methods, voice_methods, warning_messages)
+
+
+class MigrationAnalyzer(ast.NodeVisitor):
+    """Counts the changes DiscordTransformer would make, without making them.
+
+    ``counts`` maps each rule to the number of nodes it would modify, which
+    adds up to the transformer's ``changes``. ``warnings`` lists the
+    Diagnostic records for the changes that have to be made by hand.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self.counts = Counter()
+        self.warnings = []
+
+    def warn(self, node, code, *args):
+        self.warnings.append(Diagnostic(code, warning_messages[code].format(*args), None,
+                                        getattr(node, 'lineno', None), getattr(node, 'col_offset', None)))
+
+    def rename(self, name):
+        """Count a server to guild rename, returning the new name."""
+        new_name = guild_name(name)
+        if new_name != name:
+            self.counts['server_to_guild'] += 1
+
+        return new_name
+
+    def visit_keyword(self, node):
+        # Like the transformer, keyword values are not visited.
+        if node.arg == "game" and isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute):
+            self.counts['game_to_activity'] += 1
+
+    def visit_Expr(self, node):
+        self.generic_visit(node)
+
+        if isinstance(node.value, ast.Attribute) and node.value.attr in property_methods:
+            self.counts['attr_to_meth'] += 1
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+
+        if not isinstance(node.func, ast.Attribute):
+            return
+
+        attr = self.attribute_name(node.func.attr)
+        for _, rule in DiscordTransformer.call_index.get(attr, ()):
+            if rule == 'warn_delete_messages':
+                self.warn(node, 'delete_messages')
+            elif rule == 'warn_removed_methods':
+                self.warn(node, 'removed_method', attr)
+            else:
+                self.counts[rule] += 1
+
+            if rule == 'stateful_wait_for':
+                self.wait_for_warnings(node)
+
+    def wait_for_warnings(self, call):
+        if call.args:
+            self.warn(call, 'wait_for_timeout')
+
+        for kw in call.keywords:
+            if kw.arg != 'check' and kw.arg != 'timeout':
+                self.warn(call, 'wait_for_keyword', kw.arg)
+            elif kw.arg == 'timeout':
+                self.warn(call, 'wait_for_timeout')
+
+    def visit_arg(self, node):
+        self.generic_visit(node)
+
+        self.rename(node.arg)
+
+    def attribute_name(self, attr):
+        """The name visit_Attribute leaves an attribute with, without counting."""
+        if attr == 'edited_timestamp':
+            return 'edited_at'
+        if attr == 'game':
+            return 'activity'
+        return guild_name(attr)
+
+    def shortcut(self, node):
+        """Whether to_ctx_shortcut collapses this attribute once converted."""
+        via = node.value
+        if not isinstance(via, ast.Attribute):
+            return False
+        if self.attribute_name(via.attr) != ctx_shortcuts.get(self.attribute_name(node.attr)):
+            return False
+
+        # An inner shortcut (ctx.message.guild.me) collapses first.
+        ctx = via.value.value if self.shortcut(via) else via.value
+        return getattr(ctx, 'id', None) == 'ctx' or getattr(ctx, 'attr', None) == 'ctx'
+
+    def visit_Attribute(self, node):
+        self.generic_visit(node)
+
+        attr = node.attr
+        if attr == 'edited_timestamp':
+            attr = 'edited_at'
+            self.counts['to_edited_at'] += 1
+
+        if attr in voice_methods:
+            self.warn(node, 'voice')
+
+        if attr == 'game':
+            attr = 'activity'
+            self.counts['to_activity'] += 1
+
+        self.rename(attr)
+
+        if self.shortcut(node):
+            self.counts['to_ctx_shortcut'] += 1
+
+    def visit_Name(self, node):
+        self.generic_visit(node)
+
+        self.rename(node.id)
+
+    def visit_AsyncFunctionDef(self, node):
+        self.generic_visit(node)
+
+        args = [arg.arg for arg in node.args.args]
+        if node.name in ext_events:
+            self.counts['ext_event_changes'] += 1
+            if node.name != 'on_command_error':
+                args = args[1:]
+
+        decorators = []
+        for d in node.decorator_list:
+            if isinstance(d, ast.Attribute):
+                decorators.append(d.attr)
+            elif isinstance(d, ast.Call):
+                if isinstance(d.func, ast.Attribute):
+                    decorators.append(d.func.attr)
+
+                for kw in d.keywords:
+                    if isinstance(kw.value, ast.NameConstant) and kw.arg == 'pass_context':
+                        self.counts['remove_passcontext'] += 1
+
+        if 'command' in decorators and 'ctx' not in args:
+            self.counts['ensure_ctx_var'] += 1
+
+        if node.name in guild_events:
+            self.counts['event_changes'] += 1
+
+        self.rename(node.name)
+
+
+def analyze(tree, snowflakes=0):
+    """Analyze a syntax tree, counting ``snowflakes`` already substituted."""
+    analyzer = MigrationAnalyzer()
+    if snowflakes:
+        analyzer.counts['snowflakes'] = snowflakes
+
+    analyzer.visit(tree)
+    return analyzer
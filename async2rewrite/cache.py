@@ -0,0 +1,156 @@
+import os
+import hashlib
+import tempfile
+
+from . import __version__
+
+# Modules whose contents decide what a conversion produces.
+RULE_MODULES = ('main.py', 'patch.py', 'split.py', 'transformers.py')
+
+DEFAULT_MAX_SIZE = 128 * 1024 * 1024
+
+
+def default_cache_dir():
+    """Location used when no cache directory is given."""
+    if 'ASYNC2REWRITE_CACHE_DIR' in os.environ:
+        return os.environ['ASYNC2REWRITE_CACHE_DIR']
+
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'async2rewrite')
+
+
+def rules_version():
+    """Fingerprint of the package version and the conversion rules.
+
+    Editing a rule changes the fingerprint, so a checkout with local changes
+    never reuses output produced by different rules.
+    """
+    digest = hashlib.sha256(__version__.encode())
+    package = os.path.dirname(os.path.realpath(__file__))
+
+    for name in RULE_MODULES:
+        with open(os.path.join(package, name), 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """On-disk cache of converted source, keyed by a hash of the input.
+
+    Entries live under ``path`` (see default_cache_dir) and are evicted
+    least recently used first once they take up more than ``max_size``
+    bytes.
+    """
+
+    def __init__(self, path=None, max_size=DEFAULT_MAX_SIZE):
+        self.path = path or default_cache_dir()
+        self.max_size = max_size
+        self.version = rules_version()
+        self.size = None
+
+    def key(self, code, options=None):
+        """Hash the source, the conversion options and the rules version."""
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(repr(sorted((options or {}).items())).encode())
+        digest.update(code.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def get(self, key):
+        """Return the cached output for ``key``, or None on a miss."""
+        entry = self.entry_path(key)
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                value = f.read()
+        except OSError:
+            return None
+
+        try:
+            # Mark the entry as recently used for eviction.
+            os.utime(entry)
+        except OSError:
+            pass
+
+        return value
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``, evicting old entries if needed."""
+        entry = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        try:
+            # An entry being overwritten no longer counts towards the size.
+            old_size = os.path.getsize(entry)
+        except OSError:
+            old_size = 0
+
+        # Write to a temporary file first so readers never see half an entry.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry))
+        with open(fd, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp, entry)
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += os.path.getsize(entry) - old_size
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        """Yield ``(path, size, mtime)`` for every entry in the cache."""
+        if not os.path.isdir(self.path):
+            return
+
+        for bucket in os.scandir(self.path):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """Remove the least recently used entries until under 90% of max_size."""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        self.size = sum(size for _, size, _ in entries)
+        target = self.max_size * 0.9
+
+        for path, size, _ in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+    def clear(self):
+        """Remove every entry."""
+        for path, _, _ in list(self.entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.size = 0
+
+
+def resolve_cache(cache):
+    """Turn a ``cache=`` option into a ConversionCache (or None).
+
+    Accepts an existing cache, a directory path, or True for the default
+    location.
+    """
+    if not cache:
+        return None
+    if isinstance(cache, ConversionCache):
+        return cache
+    if cache is True:
+        return ConversionCache()
+    return ConversionCache(cache)
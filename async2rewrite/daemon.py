@@ -0,0 +1,358 @@
+import os
+import sys
+import hmac
+import json
+import socket
+import binascii
+import ipaddress
+import tempfile
+import threading
+import socketserver
+
+# Conversion options a client may pass, the rest can't be sent as JSON.
+DAEMON_OPTIONS = ('validate', 'backend', 'prefilter', 'interactive', 'exclude', 'include', 'default_excludes',
+                  'diagnostics', 'split')
+
+
+class DaemonError(Exception):
+    """A conversion that failed in the daemon, or a daemon that can't be reached."""
+
+
+def default_address():
+    """A per-user unix socket, or a localhost port where unix sockets are missing."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return '127.0.0.1:8657'
+
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(directory, 'async2rewrite-{}.sock'.format(os.getuid()))
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(address):
+    """Turn ``host:port`` into a tuple, anything else is a unix socket path.
+
+    The daemon reads any file its user can, so only loopback hosts are allowed.
+    """
+    address = address or default_address()
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit() and os.sep not in address:
+        if not is_loopback(host):
+            raise DaemonError('the daemon only listens on loopback addresses, not {}'.format(host))
+        return host, int(port)
+    return address
+
+
+def token_path(address):
+    """The file holding the token a daemon on ``address`` (from parse_address) accepts."""
+    if isinstance(address, tuple):
+        from .cache import default_cache_dir
+        return os.path.join(default_cache_dir(), 'daemon-{}.token'.format(address[1]))
+    return address + '.token'
+
+
+def write_token(path):
+    """Store a new random token in ``path``, readable by the current user only."""
+    token = binascii.hexlify(os.urandom(32)).decode('ascii')
+
+    umask = os.umask(0o077)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with open(fd, 'w') as f:
+            f.write(token)
+        os.replace(tmp, path)
+    finally:
+        os.umask(umask)
+
+    return token
+
+
+def read_token(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def warm_up(_=None):
+    """Run a conversion, so a worker process has imported and set up everything."""
+    from .main import get_result
+    return get_result('client.send_message(channel, server)')
+
+
+class DaemonServer:
+    """Converts files for clients over a socket, with a pool of warm workers.
+
+    Every client connection sends one JSON request per line and gets JSON
+    lines back (see DaemonClient). Files are read by the daemon, so paths
+    are resolved against the ``cwd`` the client sends along.
+
+    Requests must carry the token written to token_path when the daemon
+    binds, which only the daemon's user can read.
+    """
+
+    def __init__(self, address=None, workers=None, cache=None):
+        from concurrent.futures import ProcessPoolExecutor
+        from .main import resolve_cache
+
+        self.address = parse_address(address)
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = resolve_cache(cache)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.server = None
+        self.token = None
+
+    def warm(self):
+        """Start every worker process and let it convert some code once."""
+        list(self.executor.map(warm_up, range(self.workers)))
+
+    def bind(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line.decode('utf-8'))
+                        for response in daemon.handle(request):
+                            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                    except (BrokenPipeError, ConnectionResetError):
+                        return
+                    except Exception as e:
+                        self.wfile.write(json.dumps({'error': describe(e), 'done': True}).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+
+        if isinstance(self.address, tuple):
+            base = socketserver.ThreadingTCPServer
+        else:
+            base = socketserver.ThreadingUnixStreamServer
+            self.remove_stale_socket()
+
+        class Server(base):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        # Only the user running the daemon may ask it to read files. The
+        # socket is created without permissions for anyone else, rather
+        # than restricted once it is already listening.
+        umask = os.umask(0o077)
+        try:
+            self.server = Server(self.address, Handler)
+        finally:
+            os.umask(umask)
+
+        self.token = write_token(token_path(self.address))
+
+    def remove_stale_socket(self):
+        if not os.path.exists(self.address):
+            return
+
+        # A daemon whose token can't be read is still listening.
+        try:
+            DaemonClient(self.address).connect().close()
+        except OSError:
+            pass
+        else:
+            raise DaemonError('a daemon is already listening on {}'.format(self.address))
+
+        os.remove(self.address)
+
+    def handle(self, request):
+        """Yield the responses to a request."""
+        token = str(request.get('token')).encode('utf-8')
+        if self.token is None or not hmac.compare_digest(token, self.token.encode('ascii')):
+            yield {'error': 'missing or wrong daemon token', 'done': True}
+            return
+
+        op = request.get('op')
+        options = {key: value for key, value in request.get('options', {}).items() if key in DAEMON_OPTIONS}
+
+        if op == 'ping':
+            yield {'pong': True, 'pid': os.getpid(), 'workers': self.workers, 'done': True}
+
+        elif op == 'text':
+            from .main import get_result
+            try:
+                yield {'result': self.executor.submit(get_result, request['text'], **options).result(),
+                       'done': True}
+            except Exception as e:
+                yield {'error': describe(e), 'done': True}
+
+        elif op == 'files':
+            yield from self.convert_files(request['paths'], request.get('cwd') or os.getcwd(), options)
+            yield {'done': True}
+
+        elif op == 'shutdown':
+            yield {'done': True}
+            threading.Thread(target=self.server.shutdown).start()
+
+        else:
+            yield {'error': 'unknown request {!r}'.format(op), 'done': True}
+
+    def convert_files(self, paths, cwd, options):
+        from .main import iter_files
+
+        absolutes = [os.path.join(cwd, path) for path in paths]
+        results = iter_files(*absolutes, executor=self.executor, workers=self.workers, cache=self.cache,
+                             return_exceptions=True, **options)
+
+        # Files come back in the order of the paths they were found under,
+        # and are keyed by the path as the client gave it.
+        index = 0
+        for key, result in results:
+            while not within(key, absolutes[index]):
+                index += 1
+            key = paths[index] + key[len(absolutes[index]):]
+
+            if isinstance(result, Exception):
+                yield {'path': key, 'error': describe(result)}
+            elif options.get('diagnostics'):
+                result, found = result
+                yield {'path': key, 'result': [result, [d._replace(file=key) for d in found]]}
+            else:
+                yield {'path': key, 'result': result}
+
+    def serve_forever(self):
+        if self.server is None:
+            self.bind()
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.server_close()
+            if not isinstance(self.address, tuple) and os.path.exists(self.address):
+                os.remove(self.address)
+        if self.token is not None and read_token(token_path(self.address)) == self.token:
+            os.remove(token_path(self.address))
+        self.executor.shutdown(wait=False)
+
+
+def within(path, top):
+    """Whether ``path`` is ``top`` or was found by walking it."""
+    return path == top or path.startswith(top if top.endswith('/') else top + '/')
+
+
+def describe(e):
+    return '{}: {}'.format(type(e).__name__, e)
+
+
+def decode(result, options):
+    """A result as get_result returns it, with diagnostics sent as lists turned back into Diagnostics."""
+    if not options.get('diagnostics'):
+        return result
+
+    from .transformers import Diagnostic
+    result, found = result
+    return result, [Diagnostic(*d) for d in found]
+
+
+class DaemonClient:
+    """Sends conversions to a running DaemonServer.
+
+    Only needs the standard library, so a client starts quickly and leaves
+    the conversion work to the daemon's warm workers. Every request is sent
+    with the token from token_path.
+    """
+
+    def __init__(self, address=None, timeout=None):
+        self.address = parse_address(address)
+        self.timeout = timeout
+
+    def connect(self):
+        family = socket.AF_INET if isinstance(self.address, tuple) else socket.AF_UNIX
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def request(self, request):
+        """Send a request, yielding every response until the last one."""
+        try:
+            sock = self.connect()
+        except OSError as e:
+            raise DaemonError('no daemon listening on {}: {}'.format(self.address, e))
+
+        request = dict(request, token=read_token(token_path(self.address)))
+        with sock, sock.makefile('rb') as responses:
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            for line in responses:
+                response = json.loads(line.decode('utf-8'))
+                yield response
+                if response.get('done'):
+                    return
+
+        raise DaemonError('the daemon closed the connection')
+
+    def ping(self):
+        """Whether a daemon is listening."""
+        try:
+            return any(response.get('pong') for response in self.request({'op': 'ping'}))
+        except (DaemonError, OSError, ValueError):
+            return False
+
+    def from_text(self, text, **options):
+        """Convert code in the daemon, like async2rewrite.from_text."""
+        for response in self.request({'op': 'text', 'text': text, 'options': options}):
+            if 'error' in response:
+                raise DaemonError(response['error'])
+            return decode(response['result'], options)
+
+    def iter_files(self, *paths, return_exceptions=False, **options):
+        """Convert files in the daemon, yielding results like async2rewrite.iter_files.
+
+        Failed files raise (or yield, with ``return_exceptions``) a
+        DaemonError carrying the daemon's error message.
+        """
+        request = {'op': 'files', 'paths': list(paths), 'cwd': os.getcwd(), 'options': options}
+        for response in self.request(request):
+            if 'path' not in response:
+                if 'error' in response:
+                    raise DaemonError(response['error'])
+                continue
+
+            if 'error' in response:
+                error = DaemonError(response['error'])
+                if not return_exceptions:
+                    raise error
+                yield response['path'], error
+            else:
+                yield response['path'], decode(response['result'], options)
+
+    def shutdown(self):
+        """Stop the daemon."""
+        list(self.request({'op': 'shutdown'}))
+
+
+def serve(address=None, workers=None, cache=None):
+    """Run a daemon until it is shut down or interrupted."""
+    daemon = DaemonServer(address, workers, cache)
+    try:
+        daemon.bind()
+        daemon.warm()
+    except BaseException:
+        daemon.close()
+        raise
+
+    print('async2rewrite daemon listening on {} with {} workers'.format(daemon.address, daemon.workers),
+          file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
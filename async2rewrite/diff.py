@@ -0,0 +1,30 @@
+import os
+import difflib
+
+NO_NEWLINE = '\\ No newline at end of file\n'
+
+
+def patch_path(path):
+    """The name of a file as it appears in a patch, relative and with forward slashes."""
+    return os.path.relpath(path).replace(os.sep, '/')
+
+
+def unified_diff(original, converted, path, context=3):
+    """Yield the lines of a unified diff from ``original`` to ``converted``.
+
+    The diff is made from the strings themselves, with ``context`` lines
+    around each change, and uses ``a/`` and ``b/`` prefixed paths so the
+    result can be applied with ``git apply``. Nothing is yielded when the
+    two are identical.
+    """
+    name = patch_path(path)
+    lines = difflib.unified_diff(original.splitlines(True), converted.splitlines(True),
+                                 'a/' + name, 'b/' + name, n=context)
+
+    for line in lines:
+        if line.endswith('\n'):
+            yield line
+        else:
+            # The last line of a file without a trailing newline.
+            yield line + '\n'
+            yield NO_NEWLINE
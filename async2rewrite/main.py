@@ -1,13 +1,81 @@
 import re
 import os
+import json
+from collections import deque
+from functools import lru_cache
 
-import astunparse_noparen as ast_unparse
-
+# The unparser, the analyzer, the patch backend and process pools
+# are only imported by the code paths that use them, to keep startup fast.
+from .cache import ConversionCache, resolve_cache
+from .profiling import NullTimer, ProfilingTransformer, RuleProfile, StageTimer
 from .transformers import *
 
 # Detects 17-19 digit integers within quotes (snowflake detection)
 snowflake_regex = re.compile(r"['\"](\d{17,19})['\"]")
 
+identifier_regex = re.compile(r"[^\W\d]\w*")
+
+line_regex = re.compile(r"\r\n?|\n")
+
+
+def needs_conversion(code):
+    """Cheaply checks whether any rule could apply to a string of code.
+
+    Looks for trigger_names, server renames and quoted snowflakes
+    without building a syntax tree.
+    """
+    if 'erver' in code or snowflake_regex.search(code):
+        return True
+
+    # Substring checks are fast but also match inside longer names, so
+    # confirm any hit against the identifiers actually present.
+    if not any(name in code for name in trigger_names):
+        return False
+
+    return not trigger_names.isdisjoint(identifier_regex.findall(code))
+
+
+def snowflake_repl(match):
+    # Cast the snowflake string into an integer
+    # This should never fail, but this will raise in case it does.
+    possible_snowflake = int(match.group(1))
+
+    # Cast the snowflake back into a string (for substitution)
+    return str(possible_snowflake)
+
+
+def mark_lines(code):
+    """Running counts of the lines of code a rule could apply to.
+
+    ``marks[n]`` is the number of lines up to and including line ``n``
+    with a statement_name or a server rename on them, so a statement
+    from line ``a`` to ``b`` can only change if ``marks[b] != marks[a - 1]``.
+    """
+    marks = [0]
+    count = 0
+    for line in line_regex.split(code):
+        if 'erver' in line or not statement_names.isdisjoint(identifier_regex.findall(line)):
+            count += 1
+        marks.append(count)
+
+    return marks
+
+
+def check_syntax(code):
+    """Parses converted code, raising a SyntaxError if it is not valid.
+
+    Repeated keyword arguments are only reported by the compiler, not the
+    parser, so they are checked for as well.
+    """
+    tree = ast.parse(code)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and len(node.keywords) > 1:
+            names = [keyword.arg for keyword in node.keywords if keyword.arg is not None]
+            if len(names) != len(set(names)):
+                raise SyntaxError('keyword argument repeated', ('<unknown>', node.lineno, node.col_offset + 1, None))
+
+    return tree
+
 
 def get_result(code, **kwargs):
     """Performs conversion of a given string of code.
@@ -15,52 +83,509 @@ def get_result(code, **kwargs):
     This attempts to parse async(str) snowflakes and convert them
     into rewrite(int) snowflakes, fix ordering for Messageables
     and converting to shorthands where available.
+
+    Converted output is parsed again, raising a SyntaxError if it is not
+    valid, unless ``validate=False`` is passed. Code that no rule
+    could apply to (see needs_conversion) is returned as-is without being
+    parsed, unless ``prefilter=False`` is passed. Code the rules leave
+    untouched is returned as-is as well, rather than being unparsed.
+
+    With ``backend='patch'`` only the regions of the source that were
+    edited are regenerated, keeping the rest of the formatting and
+    comments. It falls back to unparsing the whole module when the edits
+    can't be spliced in (e.g. on Python versions before 3.8).
+
+    ``split=True`` (or a number of lines, see async2rewrite.split) converts
+    long code a group of top-level definitions at a time, with the same
+    result but a fraction of the memory.
+
+    ``scan=True`` only analyzes the code, returning a MigrationAnalyzer
+    with the changes that would be made and the warnings raised.
+
+    ``profile=True`` (or a StageTimer to add to) returns a tuple of the
+    result and a StageTimer holding the time spent in each stage. With
+    ``profile_rules=True`` as well, the timer's ``rules`` holds a
+    RuleProfile of the nodes each transformer rule examined and rewrote.
+
+    Changes that have to be made by hand are reported through the warnings
+    module, unless ``diagnostics=True`` is passed. Then a tuple of the result
+    and a list of Diagnostic records is returned instead (inside the
+    profile tuple, when profiling). ``filename`` is recorded in each of them.
     """
 
+    profile = kwargs.pop('profile', None)
+    profile_rules = kwargs.pop('profile_rules', False)
+    diagnostics = [] if kwargs.pop('diagnostics', False) else None
+
+    timer = NullTimer()
+    if profile or profile_rules:
+        timer = profile if isinstance(profile, StageTimer) else StageTimer()
+        if profile_rules and timer.rules is None:
+            timer.rules = RuleProfile()
+
+    result = convert(code, timer, diagnostics, **kwargs)
+    if diagnostics is not None:
+        result = result, diagnostics
+
+    if profile or profile_rules:
+        return result, timer
+    return result
+
+
+def convert(code, timer, diagnostics=None, **kwargs):
+    """get_result, timing each stage with ``timer``.
+
+    Diagnostics are added to the ``diagnostics`` list, or reported as
+    warnings when it is None.
+    """
+    filename = kwargs.pop('filename', None)
     stats = kwargs.pop('stats', False)
+    scan = kwargs.pop('scan', False)
     include_ast = kwargs.pop('include_ast', False)
+    validate = kwargs.pop('validate', True)
+    prefilter = kwargs.pop('prefilter', True)
+    backend = kwargs.pop('backend', 'unparse')
+    split = kwargs.pop('split', None)
+
+    if prefilter and not (stats or include_ast):
+        with timer.stage('prefilter'):
+            skip = not needs_conversion(code)
 
-    def snowflake_repl(match):
-        # Cast the snowflake string into an integer
-        # This should never fail, but this will raise in case it does.
-        possible_snowflake = int(match.group(1))
+        if skip:
+            # Nothing to do, hand the code back untouched.
+            if scan:
+                from .analyzer import MigrationAnalyzer
+                return MigrationAnalyzer()
+            return code
 
-        # Cast the snowflake back into a string (for substitution)
-        return str(possible_snowflake)
+    if split and timer.rules is None and not (stats or scan or include_ast) and backend == 'unparse':
+        from .split import convert_split, should_split
+        if should_split(code, split):
+            # Large modules are converted a group of statements at a time.
+            result = convert_split(code, timer, diagnostics, split, filename, validate, prefilter)
+            if result is not None:
+                return result
 
     # Perform the substitution
-    code = snowflake_regex.sub(snowflake_repl, code)
+    with timer.stage('snowflakes'):
+        code, snowflakes = snowflake_regex.subn(snowflake_repl, code)
+
+    with timer.stage('parse'):
+        expr_ast = ast.parse(code)
 
-    expr_ast = ast.parse(code)
+    if scan:
+        from .analyzer import analyze
+        with timer.stage('scan'):
+            return analyze(expr_ast, snowflakes)
 
     if stats:
-        return find_stats(expr_ast)
+        with timer.stage('stats'):
+            return find_stats(expr_ast)
 
     # Instantiate a new transformer and start walking through
     # this syntax tree.
-    new_ast = DiscordTransformer().generic_visit(expr_ast)
+    with timer.stage('transform'):
+        if timer.rules is None:
+            transformer = DiscordTransformer()
+        else:
+            transformer = ProfilingTransformer(timer.rules)
+        transformer.filename = filename
+        if prefilter:
+            # Statements that no rule could apply to are skipped.
+            transformer.marks = mark_lines(code)
+        new_ast = transformer.generic_visit(expr_ast)
+
+    if diagnostics is None:
+        emit_warnings(transformer.diagnostics)
+    else:
+        diagnostics.extend(transformer.diagnostics)
 
-    unparsed = ast_unparse.unparse(new_ast)
+    if not (transformer.changes or snowflakes):
+        # Nothing changed, so the code already is the result and doesn't
+        # need to be unparsed.
+        if include_ast:
+            return code, new_ast
+        return code
 
-    unparsed = unparsed.replace('ctx.message.guild', 'ctx.guild').replace(
-        'ctx.message.author', 'ctx.author')
-    unparsed = unparsed.replace('ctx.message.channel', 'ctx.channel').replace('ctx.guild.me', 'ctx.me')
+    unparsed = None
+    if backend == 'patch':
+        from .patch import PatchError, patch_source
+        try:
+            with timer.stage('patch'):
+                unparsed = patch_source(code, new_ast, transformer.edited)
+        except PatchError:
+            pass
 
-    # This compiles our new code, ensuring that the syntax is valid
-    # and allowing us to return the syntax tree if requested.
-    final_ast = ast.parse(unparsed)
+    if unparsed is None:
+        import astunparse_noparen as ast_unparse
+        with timer.stage('unparse'):
+            unparsed = ast_unparse.unparse(new_ast).strip()
 
-    unparsed = unparsed.strip()
+    if include_ast or validate:
+        # This compiles our new code, ensuring that the syntax is valid
+        # and allowing us to return the syntax tree if requested.
+        with timer.stage('validate'):
+            final_ast = check_syntax(unparsed)
+
+        if include_ast:
+            return unparsed, final_ast
 
-    if include_ast:
-        return unparsed, final_ast
     return unparsed
 
 
+def cacheable(options):
+    """Only plain converted source is cached, not stats, scans, syntax trees or profiles."""
+    return not any(options.get(option) for option in ('stats', 'scan', 'include_ast', 'profile', 'profile_rules'))
+
+
 def process_file(file, **kwargs):
-    """Opens, reads and processes a file."""
-    with open(file, 'r', encoding='utf-8') as f:
-        return get_result(f.read(), **kwargs)
+    """Opens, reads and processes a file.
+
+    Passing ``cache`` (a ConversionCache, a directory or True for the
+    default location) returns the stored output for unchanged files.
+    With ``profile`` the time spent reading the file is included.
+    """
+    cache = resolve_cache(kwargs.pop('cache', None))
+
+    profile = kwargs.get('profile')
+    timer = NullTimer()
+    if profile or kwargs.get('profile_rules'):
+        timer = kwargs['profile'] = profile if isinstance(profile, StageTimer) else StageTimer()
+
+    with timer.stage('read'):
+        with open(file, 'r', encoding='utf-8') as f:
+            code = f.read()
+
+    if cache is None or not cacheable(kwargs):
+        return get_result(code, filename=file, **kwargs)
+
+    key = cache_key(cache, code, kwargs)
+    result = cache_get(cache, key)
+    if result is None:
+        result = get_result(code, **dict(kwargs, diagnostics=True))
+        cache_set(cache, key, result)
+
+    return cached_result(result, file, kwargs)
+
+
+def cache_key(cache, code, options):
+    """Results are cached with their diagnostics either way, see cached_result."""
+    return cache.key(code, {key: value for key, value in options.items() if key != 'diagnostics'})
+
+
+def cache_get(cache, key):
+    """Look up a result and its diagnostics."""
+    value = cache.get(key)
+    if value is None:
+        return None
+
+    result, diagnostics = json.loads(value)
+    return result, [Diagnostic(*diagnostic) for diagnostic in diagnostics]
+
+
+def cache_set(cache, key, result):
+    cache.set(key, json.dumps(result))
+
+
+def cached_result(result, file, options):
+    """Turn a result and its diagnostics from the cache into what was asked for.
+
+    The diagnostics are returned with ``diagnostics=True`` and reported as
+    warnings otherwise, so a cache hit tells as much as a conversion. Cached
+    results are shared by identical files, so they are stored without a
+    filename and get ``file`` recorded here.
+    """
+    result, diagnostics = result
+    diagnostics = [diagnostic._replace(file=file) for diagnostic in diagnostics]
+    if not options.get('diagnostics'):
+        emit_warnings(diagnostics)
+        return result
+
+    return result, diagnostics
+
+
+class ConversionError(Exception):
+    """Raised by from_file when one or more files fail to convert.
+
+    ``errors`` maps each failed path to the exception it raised and
+    ``results`` holds the files that did convert.
+    """
+
+    def __init__(self, errors, results):
+        self.errors = errors
+        self.results = results
+        super().__init__('\n'.join('{}: {}: {}'.format(path, type(e).__name__, e) for path, e in errors.items()))
+
+
+# Directories that never hold code to convert, left out of every walk.
+default_excludes = ('.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv', 'env', '__pycache__', '.mypy_cache',
+                    '.pytest_cache', 'node_modules', 'site-packages', '*.egg-info', 'build', 'dist')
+
+
+@lru_cache(maxsize=None)
+def glob_regex(pattern):
+    """Compile a glob, where ``*`` and ``?`` stop at a ``/`` and ``**`` matches any number of directories."""
+    parts = []
+    segments = pattern.split('/')
+    for index, segment in enumerate(segments):
+        last = index == len(segments) - 1
+        if segment == '**':
+            parts.append('.*' if last else '(?:.*/)?')
+            continue
+
+        i = 0
+        while i < len(segment):
+            char = segment[i]
+            i += 1
+            if char == '*':
+                parts.append('[^/]*')
+            elif char == '?':
+                parts.append('[^/]')
+            elif char == '[' and segment.find(']', i + 1) != -1:
+                end = segment.index(']', i + 1)
+                chars = segment[i:end]
+                if chars.startswith('!'):
+                    chars = '^' + chars[1:]
+                parts.append('[{}]'.format(chars.replace('\\', '\\\\')))
+                i = end + 1
+            else:
+                parts.append(re.escape(char))
+
+        if not last:
+            parts.append('/')
+
+    return re.compile(''.join(parts) + r'\Z')
+
+
+def matches(name, path, patterns, directory=False):
+    """Whether a file or directory matches any of the ``.gitignore``-style ``patterns``.
+
+    A pattern with a ``/`` in it (a leading one included) matches ``path``,
+    relative to the directory walked, and any other matches ``name``. A
+    pattern ending in ``/`` only matches directories.
+    """
+    for pattern in patterns:
+        if pattern.endswith('/'):
+            if not directory:
+                continue
+            pattern = pattern.rstrip('/')
+
+        if '/' in pattern:
+            if glob_regex(pattern.lstrip('/')).match(path):
+                return True
+        elif glob_regex(pattern).match(name):
+            return True
+
+    return False
+
+
+def matches_parent(path, patterns):
+    """Whether any of the directories leading to ``path`` match ``patterns``."""
+    parts = path.split('/')
+    return any(matches(parts[i - 1], '/'.join(parts[:i]), patterns, directory=True) for i in range(1, len(parts)))
+
+
+def collect_files(*files, **kwargs):
+    """Expand a list of files or directories into the python files to convert.
+
+    Files and directories matching a pattern in ``exclude`` (see matches)
+    are skipped, and so are default_excludes unless ``default_excludes=False``
+    is passed. With ``include``, only files matching one of its patterns,
+    or inside a directory that does, are kept.
+    Directories are entered once, so symlink cycles are safe to walk.
+    """
+    exclude = tuple(kwargs.pop('exclude', None) or ())
+    include = tuple(kwargs.pop('include', None) or ())
+    prune = exclude + default_excludes if kwargs.pop('default_excludes', True) else exclude
+
+    def wanted(name, path):
+        if matches(name, path, exclude):
+            return False
+        # A file in an included directory is included as well.
+        return not include or matches(name, path, include) or matches_parent(path, include)
+
+    for path in files:
+        if path.endswith('.py'):
+            # The user has passed a direct file, convert on its own.
+            if wanted(os.path.basename(path), os.path.normpath(path).replace(os.sep, '/')):
+                yield path
+        else:
+            # This is either a directory or a symlink, walk through and
+            # modify any files we detect.
+            yield from walk(path, prune, wanted)
+
+
+def selection(options):
+    """Pop the collect_files options out of a dict of conversion options."""
+    return {key: options.pop(key) for key in ('exclude', 'include', 'default_excludes') if key in options}
+
+
+def walk(top, prune, wanted):
+    """Yield the python files under ``top``, in the order os.walk would."""
+    seen = set()
+    stack = [(top, '')]
+
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            stat = os.stat(directory)
+            scan = os.scandir(directory)
+            try:
+                entries = list(scan)
+            finally:
+                # The iterator is only a context manager (with close) from 3.6.
+                if hasattr(scan, 'close'):
+                    scan.close()
+        except OSError:
+            continue
+
+        # Symlinks are followed, but a directory reached twice (through a
+        # symlink cycle, say) is only walked the first time.
+        if (stat.st_dev, stat.st_ino) in seen:
+            continue
+        seen.add((stat.st_dev, stat.st_ino))
+
+        directories = []
+        for entry in entries:
+            relative = prefix + entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+
+            if is_dir:
+                if not matches(entry.name, relative, prune, directory=True):
+                    directories.append((os.path.join(directory, entry.name), relative + '/'))
+            elif entry.name.endswith('.py') and wanted(entry.name, relative):
+                # Only process python files
+                yield '{}/{}'.format(directory, entry.name)
+
+        stack.extend(reversed(directories))
+
+
+def iter_files(*files, **kwargs):
+    """Process a list of files or directories one file at a time.
+
+    Yields ``(path, result)`` as soon as each file is converted, in the
+    order the files were found, so only a handful of results are held in
+    memory at once. ``workers`` and ``cache`` behave as in from_file. With
+    ``return_exceptions=True`` a failed file yields the exception it raised
+    as its result instead of stopping the iteration.
+
+    An already running ``executor`` can be passed to convert the files in
+    instead of starting a process pool, it is left running afterwards.
+    ``exclude``, ``include`` and ``default_excludes`` select the files as
+    in collect_files.
+    """
+    workers = kwargs.pop('workers', None)
+    executor = kwargs.pop('executor', None)
+    return_exceptions = kwargs.pop('return_exceptions', False)
+    files = collect_files(*files, **selection(kwargs))
+
+    cache = resolve_cache(kwargs.pop('cache', None))
+    if cache is not None and not cacheable(kwargs):
+        cache = None
+
+    if executor is None and (workers is None or workers == 1):
+        for path in files:
+            try:
+                result = process_file(path, cache=cache, **kwargs)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                result = e
+            yield path, result
+        return
+
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    # Keep a couple of files queued per process so workers never sit idle,
+    # without submitting (and holding the results of) the whole tree.
+    window = 2 * (workers or os.cpu_count() or 1)
+    pending = deque()
+
+    # Conversions in flight by cache key, so identical files in one batch
+    # share a single conversion.
+    inflight = {}
+
+    # Large files are split into groups of statements, converted across
+    # the pool like files of their own.
+    split = kwargs.get('split')
+    if split:
+        from .split import can_split, should_split, submit_split
+        if not can_split(kwargs):
+            split = None
+
+    def submit_code(code, filename=None, options=kwargs):
+        if split and should_split(code, split) and (not options.get('prefilter', True) or needs_conversion(code)):
+            return submit_split(executor, code, filename, **options)
+        return executor.submit(get_result, code, filename=filename, **options)
+
+    def submit(path):
+        if cache is None and not split:
+            return executor.submit(process_file, path, **kwargs), None
+
+        # Cache lookups happen here so hits never reach the pool.
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                code = f.read()
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+            return future, None
+
+        if cache is None:
+            return submit_code(code, path), None
+
+        key = cache_key(cache, code, kwargs)
+        if key in inflight:
+            return inflight[key], None
+
+        result = cache_get(cache, key)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return future, None
+
+        # Diagnostics are cached along with the result, see cached_result.
+        inflight[key] = submit_code(code, options=dict(kwargs, diagnostics=True))
+        return inflight[key], key
+
+    def finish(path, future, key):
+        try:
+            result = future.result()
+            if key is not None:
+                cache_set(cache, key, result)
+            if cache is not None:
+                result = cached_result(result, path, kwargs)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            result = e
+        finally:
+            inflight.pop(key, None)
+
+        return path, result
+
+    owned = executor is None
+    if owned:
+        executor = ProcessPoolExecutor(max_workers=workers or None)
+
+    try:
+        for path in files:
+            pending.append((path,) + submit(path))
+            if len(pending) >= window:
+                yield finish(*pending.popleft())
+
+        while pending:
+            yield finish(*pending.popleft())
+    finally:
+        # The consumer stopped early or a file raised, drop queued work.
+        for _, future, _ in pending:
+            future.cancel()
+
+        if owned:
+            executor.shutdown()
 
 
 def from_file(*files, **kwargs):
@@ -68,23 +593,30 @@ def from_file(*files, **kwargs):
     
     Abstraction for get_result, returns batch results for a file or
     files in a given directory
+
+    Passing ``workers`` spreads the files over a process pool of that size
+    (``0`` uses every CPU). Results keep the order files were found in and
+    failures are collected per file into a ConversionError.
+
+    Passing ``cache`` (see process_file) skips files whose output is
+    already stored and converts identical files only once per batch.
     """
+    workers = kwargs.get('workers')
+
+    if workers is None or workers == 1:
+        return dict(iter_files(*files, **kwargs))
+
     res = {}
+    errors = {}
 
-    for path in files:
-        if path.endswith('.py'):
-            # The user has passed a direct file, convert on its own.
-            res[path] = process_file(path, **kwargs)
+    for path, result in iter_files(*files, return_exceptions=True, **kwargs):
+        if isinstance(result, Exception):
+            errors[path] = result
         else:
-            # This is either a directory or a symlink, walk through and
-            # modify any files we detect.
-            for dir_path, _, file_names in os.walk(path, followlinks=True):
-                for file in file_names:
-                    file_path = '{}/{}'.format(dir_path, file)
+            res[path] = result
 
-                    if file_path.endswith('.py'):
-                        # Only process python files
-                        res[file_path] = process_file(file_path, **kwargs)
+    if errors:
+        raise ConversionError(errors, res)
 
     return res
 
@@ -92,3 +624,4 @@ def from_file(*files, **kwargs):
 def from_text(text, **kwargs):
     """Frontend interface for processing raw text."""
     return get_result(text, **kwargs)
+
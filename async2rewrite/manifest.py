@@ -0,0 +1,199 @@
+import os
+import json
+import hashlib
+import tempfile
+
+from .cache import rules_version
+
+DEFAULT_MANIFEST = '.a2r-manifest.json'
+
+DEFAULT_JOURNAL = '.a2r-journal.jsonl'
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def git_changed_files(ref=None, cwd=None):
+    """Files reported by ``git diff --name-only``, relative to ``cwd``.
+
+    Compares the working tree against ``ref`` (the index when None).
+    """
+    import subprocess
+
+    command = ['git', 'diff', '--name-only', '--relative']
+    if ref:
+        command.append(ref)
+
+    output = subprocess.check_output(command, cwd=cwd, universal_newlines=True)
+    return {os.path.normpath(line) for line in output.splitlines() if line}
+
+
+class Manifest:
+    """Record of previously converted files, used for incremental runs.
+
+    For every input path it stores the mtime, size and hash of the source
+    along with the outputs written for it. A file is up to date when its
+    source is unchanged and all of its outputs still exist. Entries made by
+    a different version of the rules are ignored.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.path = path
+        self.version = rules_version()
+        self.files = {}
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') == self.version:
+            self.files = data.get('files', {})
+
+    def is_current(self, path, outputs):
+        """Whether ``path`` is unchanged and every one of ``outputs`` exists.
+
+        Files that needed no conversion last time have no outputs to check.
+        """
+        entry = self.files.get(path)
+        if entry is None:
+            return False
+
+        required = [] if entry.get('unchanged') else outputs
+        if not set(required) <= set(entry['outputs']):
+            return False
+
+        if not all(os.path.exists(output) for output in required):
+            return False
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        if stat.st_mtime_ns == entry['mtime'] and stat.st_size == entry['size']:
+            return True
+
+        # The file was touched; only the contents decide whether it changed.
+        if stat.st_size != entry['size'] or file_digest(path) != entry['sha256']:
+            return False
+
+        entry['mtime'] = stat.st_mtime_ns
+        return True
+
+    def record(self, path, outputs, result, unchanged=False):
+        """Remember that ``path`` was converted to ``result`` in ``outputs``.
+
+        ``unchanged`` marks a file that needed no conversion at all.
+        """
+        stat = os.stat(path)
+        self.files[path] = {
+            'unchanged': unchanged,
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': file_digest(path),
+            'outputs': list(outputs),
+            'output_sha256': hashlib.sha256(result.encode('utf-8', 'surrogatepass')).hexdigest(),
+        }
+
+    def forget(self, path):
+        self.files.pop(path, None)
+
+    def save(self):
+        """Atomically write the manifest back to disk."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with open(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'files': self.files}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+class Journal:
+    """Append-only record of what happened to each file of a batch run.
+
+    Every file gets a JSON line with its ``status``: ``ok`` when it was
+    converted, ``skipped`` when it needed no changes and ``failed`` (with
+    the ``error``) when it couldn't be converted. Lines are flushed to disk
+    as they are written, so a run that is killed half way can be resumed
+    from the journal, see ``is_done``. A journal written by a different
+    version of the rules is started over.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL, resume=False):
+        self.path = path
+        self.version = rules_version()
+        self.files = {}
+
+        if resume:
+            self.load()
+
+        self.file = open(path, 'a' if self.files else 'w', encoding='utf-8')
+        if not self.files:
+            self.write({'version': self.version})
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+
+        try:
+            if json.loads(lines[0]).get('version') != self.version:
+                return
+        except (IndexError, ValueError):
+            return
+
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line of a run that was killed while writing it.
+                continue
+            self.files[entry['path']] = entry
+
+    def is_done(self, path):
+        """Whether ``path`` was converted (or skipped) and hasn't changed since.
+
+        Files that failed are tried again.
+        """
+        entry = self.files.get(path)
+        if entry is None or entry['status'] == 'failed':
+            return False
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        return stat.st_mtime_ns == entry['mtime'] and stat.st_size == entry['size']
+
+    def record(self, path, status, error=None):
+        """Append the outcome for ``path``, ``status`` being ``ok``, ``skipped`` or ``failed``."""
+        entry = {'path': path, 'status': status, 'mtime': None, 'size': None}
+        try:
+            stat = os.stat(path)
+            entry['mtime'], entry['size'] = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            pass
+
+        if error is not None:
+            entry['error'] = error
+
+        self.files[path] = entry
+        self.write(entry)
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry, sort_keys=True) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,136 @@
+import io
+import ast
+import copy
+import tokenize
+
+try:
+    from ast import unparse
+except ImportError:
+    # Python 3.8
+    from astunparse_noparen import unparse
+
+
+class PatchError(Exception):
+    """Raised when edits can't be spliced into the source text."""
+
+
+def has_header(node):
+    """Whether a node is a compound statement, edited through its header."""
+    return isinstance(node, ast.stmt) and isinstance(getattr(node, 'body', None), list)
+
+
+class SourcePatcher:
+    """Splices the nodes a DiscordTransformer edited back into the source.
+
+    Only the outermost edited regions are regenerated, everything else
+    (formatting, comments) is kept as written. Nodes without source
+    positions are replaced by their closest positioned parent.
+    """
+
+    def __init__(self, code, tree):
+        self.code = code
+        self.tree = tree
+        self.parents = None
+
+        # Offset of the start of every line, as counted by the parser.
+        self.line_starts = [0]
+        index = code.find('\n')
+        while index != -1:
+            self.line_starts.append(index + 1)
+            index = code.find('\n', index + 1)
+
+    def offset(self, lineno, col_offset):
+        """Convert a (line, utf-8 byte column) position into a string offset."""
+        start = self.line_starts[lineno - 1]
+        line = self.code[start:start + col_offset]
+
+        # Columns count bytes, so only ASCII lines can be indexed directly.
+        if not line.isascii():
+            end = self.line_starts[lineno] if lineno < len(self.line_starts) else len(self.code)
+            line = self.code[start:end].encode('utf-8')[:col_offset].decode('utf-8', 'strict')
+
+        return start + len(line)
+
+    def positioned(self, node):
+        """Climb from ``node`` to the closest node with a full source span."""
+        while getattr(node, 'end_col_offset', None) is None:
+            if self.parents is None:
+                self.parents = {id(child): parent for parent in ast.walk(self.tree)
+                                for child in ast.iter_child_nodes(parent)}
+            node = self.parents.get(id(node))
+            if node is None:
+                raise PatchError('edited node has no source position')
+
+        return node
+
+    def span(self, node):
+        """The ``(start, end)`` offsets a node's replacement should cover."""
+        start = self.offset(node.lineno, node.col_offset)
+        if not has_header(node):
+            return start, self.offset(node.end_lineno, node.end_col_offset)
+
+        # Only the header of a compound statement is replaced, up to and
+        # including the colon before its body.
+        body_start = self.offset(node.body[0].lineno, node.body[0].col_offset)
+        header = self.code[start:body_start]
+        depth = 0
+        try:
+            for token in tokenize.generate_tokens(io.StringIO(header).readline):
+                if token.type != tokenize.OP:
+                    continue
+                if token.string in '([{':
+                    depth += 1
+                elif token.string in ')]}':
+                    depth -= 1
+                elif token.string == ':' and depth == 0:
+                    row, col = token.end
+                    lines = header.splitlines(True)
+                    return start, start + sum(len(line) for line in lines[:row - 1]) + col
+        except (tokenize.TokenError, IndentationError) as e:
+            raise PatchError(str(e))
+
+        raise PatchError('header of {} not found'.format(type(node).__name__))
+
+    def render(self, node):
+        """Source text for an edited node."""
+        try:
+            if not has_header(node):
+                return unparse(node).strip()
+
+            header = copy.copy(node)
+            header.decorator_list = []
+            header.body = [ast.Pass()]
+            return unparse(header).strip().split('\n', 1)[0]
+        except Exception as e:
+            raise PatchError('{} could not be rendered: {}'.format(type(node).__name__, e)) from e
+
+    def patch(self, edited):
+        """Return the source with every edited node's region regenerated."""
+        spans = []
+        for node in edited:
+            node = self.positioned(node)
+            start, end = self.span(node)
+            spans.append((start, -end, node))
+
+        # Edits nested inside another edited node are part of its rendering.
+        spans.sort(key=lambda span: span[:2])
+        chunks = []
+        last = 0
+        for start, end, node in spans:
+            end = -end
+            if start < last:
+                if end <= last:
+                    continue
+                raise PatchError('overlapping edits')
+
+            chunks.append(self.code[last:start])
+            chunks.append(self.render(node))
+            last = end
+
+        chunks.append(self.code[last:])
+        return ''.join(chunks)
+
+
+def patch_source(code, tree, edited):
+    """Splice the ``edited`` nodes of ``tree`` (parsed from ``code``) into it."""
+    return SourcePatcher(code, tree).patch(edited)
@@ -0,0 +1,153 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from .transformers import DiscordTransformer
+
+
+class StageTimer:
+    """Wall-clock time spent in each stage of a conversion.
+
+    ``stages`` maps each stage name (``read``, ``prefilter``, ``snowflakes``,
+    ``parse``, ``transform``, ``unparse``, ``validate``, ...) to the seconds
+    spent in it, in the order the stages first ran.
+    """
+
+    def __init__(self, rules=None):
+        self.stages = {}
+
+        # A RuleProfile when the transformer's rules are profiled as well.
+        self.rules = rules
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def update(self, other):
+        """Add the stages of another StageTimer to this one."""
+        for name, seconds in other.stages.items():
+            self.add(name, seconds)
+
+        if other.rules is not None:
+            if self.rules is None:
+                self.rules = RuleProfile()
+            self.rules.update(other.rules)
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def __repr__(self):
+        stages = ', '.join('{}={:.6f}'.format(name, seconds) for name, seconds in self.stages.items())
+        return '<StageTimer {}>'.format(stages)
+
+
+class NullTimer:
+    """Stands in for a StageTimer when conversions aren't being profiled."""
+
+    rules = None
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def add(self, name, seconds):
+        pass
+
+
+class RuleStats:
+    """How many nodes a rule examined and rewrote, and the time it took."""
+
+    __slots__ = ('examined', 'rewritten', 'seconds')
+
+    def __init__(self, examined=0, rewritten=0, seconds=0.0):
+        self.examined = examined
+        self.rewritten = rewritten
+        self.seconds = seconds
+
+    def __getstate__(self):
+        return self.examined, self.rewritten, self.seconds
+
+    def __setstate__(self, state):
+        self.examined, self.rewritten, self.seconds = state
+
+    def __repr__(self):
+        return '<RuleStats examined={0.examined} rewritten={0.rewritten} seconds={0.seconds:.6f}>'.format(self)
+
+
+class RuleProfile:
+    """RuleStats for every rule a ProfilingTransformer ran, by rule name."""
+
+    def __init__(self):
+        self.rules = {}
+
+    def __getitem__(self, rule):
+        return self.rules[rule]
+
+    def __contains__(self, rule):
+        return rule in self.rules
+
+    def record(self, rule, rewritten, seconds):
+        stats = self.rules.get(rule)
+        if stats is None:
+            stats = self.rules[rule] = RuleStats()
+
+        stats.examined += 1
+        stats.rewritten += rewritten
+        stats.seconds += seconds
+
+    def update(self, other):
+        """Add the counts and times of another RuleProfile to this one."""
+        for rule, other_stats in other.rules.items():
+            stats = self.rules.setdefault(rule, RuleStats())
+            stats.examined += other_stats.examined
+            stats.rewritten += other_stats.rewritten
+            stats.seconds += other_stats.seconds
+
+    def most_expensive(self):
+        """``(rule, RuleStats)`` pairs, the slowest rules first."""
+        return sorted(self.rules.items(), key=lambda item: item[1].seconds, reverse=True)
+
+
+class ProfilingTransformer(DiscordTransformer):
+    """A DiscordTransformer recording a RuleProfile of every rule it runs.
+
+    Each rule in ``rules`` is wrapped on the instance, so the visitors and
+    call dispatch run it through the wrapper. A rule counts as having
+    rewritten a node when it touched the tree. Call rules and
+    game_to_activity are touched by their caller instead, so every time
+    they run counts, except for the passive rules that only warn.
+    """
+
+    def __init__(self, profile=None):
+        super().__init__()
+
+        self.profile = RuleProfile() if profile is None else profile
+
+        caller_touched = {rule for rule, _ in self.call_rules if rule not in self.passive_rules}
+        caller_touched.add('game_to_activity')
+
+        for rule in self.rules:
+            setattr(self, rule, self.instrument(rule, getattr(self, rule), rule in caller_touched))
+
+    def instrument(self, rule, method, caller_touched):
+        profile = self.profile
+
+        @wraps(method)
+        def wrapper(*args):
+            changes = self.changes
+            start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                seconds = time.perf_counter() - start
+                profile.record(rule, caller_touched or self.changes != changes, seconds)
+
+        return wrapper
@@ -0,0 +1,156 @@
+import io
+import ast
+
+from .main import check_syntax, get_result, mark_lines, snowflake_regex, snowflake_repl
+from .transformers import DiscordTransformer, emit_warnings
+
+# Lines per group of statements when ``split=True`` is passed.
+DEFAULT_SPLIT_LINES = 2000
+
+# The lines a group may start at: top-level definitions and their decorators.
+GROUP_STARTS = ('def ', 'async def ', 'class ', '@')
+
+
+def split_lines(split):
+    return DEFAULT_SPLIT_LINES if split is True else split
+
+
+def can_split(options):
+    """Whether a conversion with these options gives the same result in groups."""
+    if any(options.get(option) for option in ('stats', 'scan', 'include_ast', 'profile', 'profile_rules')):
+        return False
+    return options.get('backend', 'unparse') == 'unparse'
+
+
+def should_split(code, split):
+    """Whether ``code`` is long enough to be split in groups of ``split`` lines."""
+    return code.count('\n') > split_lines(split)
+
+
+def split_source(code, lines=DEFAULT_SPLIT_LINES):
+    """Split a module into groups of top-level definitions.
+
+    A group starts at a ``def``, ``class`` or decorator at the start of a
+    line after a blank one, and is at least ``lines`` lines long. Returns
+    ``(offset, source)`` pairs, where ``offset`` is the number of lines
+    before the group, and joining the sources gives back ``code``.
+
+    The code isn't parsed to find the groups, so a group may start inside
+    a string by mistake. The group before it then fails to parse.
+    """
+    # Split on the same line endings the parser counts.
+    source_lines = io.StringIO(code, newline='').readlines()
+
+    starts = [0]
+    for number, line in enumerate(source_lines):
+        if number - starts[-1] >= lines and line.startswith(GROUP_STARTS) and not source_lines[number - 1].strip():
+            starts.append(number)
+
+    starts.append(len(source_lines))
+    return [(start, ''.join(source_lines[start:stop])) for start, stop in zip(starts, starts[1:])]
+
+
+def convert_group(source, offset, prefilter=True):
+    """Convert one group of statements from split_source.
+
+    Returns whether anything changed, the group unparsed and its
+    diagnostics, with the line numbers of the whole module.
+    """
+    import astunparse_noparen as ast_unparse
+
+    source, snowflakes = snowflake_regex.subn(snowflake_repl, source)
+    tree = ast.parse(source)
+
+    transformer = DiscordTransformer()
+    if prefilter:
+        transformer.marks = mark_lines(source)
+    transformer.generic_visit(tree)
+
+    diagnostics = [d if d.line is None else d._replace(line=d.line + offset) for d in transformer.diagnostics]
+    return bool(transformer.changes or snowflakes), ast_unparse.unparse(tree), diagnostics
+
+
+def stitch(code, results, filename=None, diagnostics=None, validate=True):
+    """Join the results of convert_group back into a whole module.
+
+    Gives the same result get_result would for the whole of ``code``.
+    """
+    changed = False
+    parts = []
+    found = []
+    for group_changed, unparsed, group_diagnostics in results:
+        changed = changed or group_changed
+
+        # Every group is unparsed with a newline at the end, a module only has one.
+        parts.append(unparsed[:-1])
+        found.extend(d._replace(file=filename) for d in group_diagnostics)
+
+    if diagnostics is None:
+        emit_warnings(found)
+    else:
+        diagnostics.extend(found)
+
+    if not changed:
+        return code
+
+    result = ''.join(parts).strip()
+    if validate:
+        check_syntax(result)
+    return result
+
+
+def convert_split(code, timer, diagnostics=None, split=True, filename=None, validate=True, prefilter=True):
+    """Convert a module a group of statements at a time, see split_source.
+
+    Only one group's syntax tree is kept around at a time. Returns None
+    when a group doesn't parse, the whole module has to be converted then
+    (which raises a SyntaxError with the right line number if it is broken).
+    """
+    with timer.stage('split'):
+        groups = split_source(code, split_lines(split))
+
+    results = []
+    for offset, source in groups:
+        try:
+            with timer.stage('convert'):
+                results.append(convert_group(source, offset, prefilter))
+        except SyntaxError:
+            return None
+
+    with timer.stage('stitch'):
+        return stitch(code, results, filename, diagnostics, validate)
+
+
+class SplitFuture:
+    """The groups of a module converting in an executor, standing in for the
+    future of a whole get_result.
+    """
+
+    def __init__(self, code, futures, filename, options):
+        self.code = code
+        self.futures = futures
+        self.filename = filename
+        self.options = options
+
+    def result(self):
+        try:
+            results = [future.result() for future in self.futures]
+        except SyntaxError:
+            # See convert_split.
+            return get_result(self.code, filename=self.filename, **dict(self.options, split=None))
+
+        diagnostics = [] if self.options.get('diagnostics') else None
+        result = stitch(self.code, results, self.filename, diagnostics, self.options.get('validate', True))
+        return result if diagnostics is None else (result, diagnostics)
+
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+
+
+def submit_split(executor, code, filename=None, **options):
+    """Convert the groups of a module in ``executor``, returning a SplitFuture."""
+    prefilter = options.get('prefilter', True)
+    futures = [executor.submit(convert_group, source, offset, prefilter)
+               for offset, source in split_source(code, split_lines(options['split']))]
+    return SplitFuture(code, futures, filename, options)
@@ -0,0 +1,38 @@
+import ast
+
+import async2rewrite
+from async2rewrite.transformers import DiscordTransformer
+
+CODE = """
+@bot.command(pass_context=True)
+async def info(server):
+    await bot.say(ctx.message.server.me)
+    await bot.wait_for_message(author=ctx.message.author)
+    msg.edited_timestamp
+    bot.is_ready
+"""
+
+
+def test_scan_counts_match_transformer():
+    result = async2rewrite.from_text(CODE, scan=True)
+
+    transformer = DiscordTransformer()
+    transformer.generic_visit(ast.parse(CODE))
+
+    assert sum(result.counts.values()) == transformer.changes
+    assert result.warnings == transformer.diagnostics
+
+
+def test_scan_rule_counts():
+    result = async2rewrite.from_text(CODE, scan=True)
+    assert result.counts['to_messageable'] == 1
+    assert result.counts['to_ctx_shortcut'] == 2
+    assert result.counts['ensure_ctx_var'] == 1
+    assert result.counts['remove_passcontext'] == 1
+    assert [(d.code, d.line) for d in result.warnings] == [('wait_for_keyword', 5)]
+    assert result.warnings[0].message == async2rewrite.warning_messages['wait_for_keyword'].format('author')
+
+
+def test_scan_does_not_modify():
+    result = async2rewrite.from_text("import json", scan=True)
+    assert not result.counts and not result.warnings
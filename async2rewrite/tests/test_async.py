@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import async2rewrite
+
+
+def test_from_text_async():
+    result = asyncio.run(async2rewrite.from_text_async("bot.ban(member)"))
+    assert result == "member.ban()"
+
+
+def test_from_file_async(tmpdir):
+    for n in range(10):
+        tmpdir.join('bot_{}.py'.format(n)).write("bot.kick(member_{})".format(n))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = asyncio.run(async2rewrite.from_file_async(str(tmpdir), executor=executor, concurrency=3))
+
+    assert len(results) == 10
+    for path, result in results.items():
+        n = path.rsplit('_', 1)[1][:-3]
+        assert result == "member_{}.kick()".format(n)
+
+
+def test_from_file_async_errors(tmpdir):
+    tmpdir.join('good.py').write("bot.ban(member)")
+    tmpdir.join('bad.py').write("bot.ban(member:")
+
+    with pytest.raises(async2rewrite.ConversionError) as excinfo:
+        asyncio.run(async2rewrite.from_file_async(str(tmpdir)))
+
+    assert list(excinfo.value.errors) == [str(tmpdir.join('bad.py'))]
+    assert excinfo.value.results == {str(tmpdir.join('good.py')): "member.ban()"}
+
+
+def test_iter_files_async_cancel(tmpdir):
+    for n in range(20):
+        tmpdir.join('bot_{:02}.py'.format(n)).write("bot.ban(member)")
+
+    started = []
+    gate = threading.Event()
+
+    class Executor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            def run():
+                started.append(fn)
+                gate.wait(5)
+                return fn(*args, **kwargs)
+            return super().submit(run)
+
+    async def consume(executor):
+        async for _ in async2rewrite.iter_files_async(str(tmpdir), executor=executor, concurrency=4):
+            pass
+
+    async def main(executor):
+        task = asyncio.ensure_future(consume(executor))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        gate.set()
+
+    with Executor(max_workers=1) as executor:
+        asyncio.run(main(executor))
+
+    # The conversion running when cancelled finishes, the queued ones never start.
+    assert len(started) == 1
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import async2rewrite
+from async2rewrite.cache import ConversionCache
+
+
+def test_cache_hit_skips_conversion(tmpdir):
+    cache = ConversionCache(str(tmpdir.join('cache')))
+    source = tmpdir.join('bot.py')
+    source.write("bot.ban(member)")
+
+    assert async2rewrite.process_file(str(source), cache=cache) == "member.ban()"
+
+    # Overwrite the stored entry to prove the next call reads from the cache.
+    key = cache.key("bot.ban(member)", {})
+    cache.set(key, json.dumps(["cached", []]))
+    assert async2rewrite.process_file(str(source), cache=cache) == "cached"
+
+
+def test_cache_key_depends_on_source_and_options(tmpdir):
+    cache = ConversionCache(str(tmpdir))
+    assert cache.key("a") == cache.key("a", {})
+    assert cache.key("a") != cache.key("b")
+    assert cache.key("a") != cache.key("a", {'interactive': True})
+
+
+def test_cache_eviction(tmpdir):
+    cache = ConversionCache(str(tmpdir), max_size=1000)
+    for n in range(10):
+        cache.set(cache.key(str(n)), 'x' * 200)
+    assert cache.size <= 1000
+    assert sum(size for _, size, _ in cache.entries()) == cache.size
+
+
+def test_cache_overwrite_keeps_size(tmpdir):
+    cache = ConversionCache(str(tmpdir), max_size=1000)
+    cache.set(cache.key("a"), 'x' * 200)
+    for _ in range(10):
+        cache.set(cache.key("a"), 'x' * 300)
+    assert cache.size == 300
+
+
+def test_cache_dedup_in_batch(tmpdir):
+    cache = ConversionCache(str(tmpdir.join('cache')))
+    for name in ('a.py', 'b.py', 'c.py'):
+        tmpdir.join(name).write("bot.kick(member)")
+    paths = [str(tmpdir.join(name)) for name in ('a.py', 'b.py', 'c.py')]
+
+    results = async2rewrite.from_file(*paths, workers=2, cache=cache)
+    assert list(results.values()) == ["member.kick()"] * 3
+    assert len(list(cache.entries())) == 1
+
+
+def test_cache_hit_reports_warnings(tmpdir):
+    cache = ConversionCache(str(tmpdir.join('cache')))
+    source = tmpdir.join('bot.py')
+    source.write("bot.delete_messages(messages)")
+
+    for _ in range(2):
+        with pytest.warns(UserWarning):
+            async2rewrite.from_file(str(source), cache=cache)
+
+    result, diagnostics = async2rewrite.process_file(str(source), cache=cache, diagnostics=True)
+    assert [(d.code, d.file) for d in diagnostics] == [('delete_messages', str(source))]
@@ -0,0 +1,42 @@
+import ast
+
+import async2rewrite
+import pytest
+from async2rewrite.transformers import DiscordTransformer
+
+
+def test_call_rules_exist():
+    for rule, _ in DiscordTransformer.call_rules:
+        assert callable(getattr(DiscordTransformer, rule))
+
+
+def test_call_index_is_ordered():
+    for attr, rules in DiscordTransformer.call_index.items():
+        positions = [position for position, _ in rules]
+        assert positions == sorted(positions)
+
+
+def test_unrelated_call_untouched():
+    converted_code = async2rewrite.from_text("bot.loop.create_task(background())")
+    assert converted_code == "bot.loop.create_task(background())"
+
+
+def test_renamed_attribute_dispatch():
+    converted_code = async2rewrite.from_text("bot.delete_server(server)")
+    assert converted_code == "guild.delete()"
+
+
+def test_removed_method_warning():
+    with pytest.warns(UserWarning):
+        async2rewrite.from_text("bot.wait_until_login()")
+
+
+def test_transformer_counts_changes():
+    transformer = DiscordTransformer()
+    transformer.generic_visit(ast.parse("bot.ban(member)\nmessage.server"))
+    assert transformer.changes == 2
+
+
+def test_untouched_code_is_not_unparsed():
+    code = "async def ctx_helper(ctx):\n    return  ctx.bot"
+    assert async2rewrite.from_text(code) == code
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import async2rewrite
+
+
+@pytest.fixture
+def tree(tmpdir):
+    for path in ['a/x.py', 'a/test_x.py', 'a/b/y.py', 'a/notes.txt', '.git/hook.py', '__pycache__/cached.py',
+                 'venv/lib/site-packages/discord/client.py', 'build/lib/top.py', 'legacy/old.py', 'top.py']:
+        tmpdir.join(path).write("bot.ban(member)", ensure=True)
+    return tmpdir
+
+
+def relative(root, paths):
+    return sorted(os.path.relpath(path, str(root)).replace(os.sep, '/') for path in paths)
+
+
+def test_default_excludes(tree):
+    assert relative(tree, async2rewrite.collect_files(str(tree))) == [
+        'a/b/y.py', 'a/test_x.py', 'a/x.py', 'legacy/old.py', 'top.py']
+
+
+def test_no_default_excludes(tree):
+    assert len(list(async2rewrite.collect_files(str(tree), default_excludes=False))) == 9
+
+
+def test_exclude(tree):
+    files = async2rewrite.collect_files(str(tree), exclude=['legacy', 'test_*', 'a/b'])
+    assert relative(tree, files) == ['a/x.py', 'top.py']
+
+
+def test_exclude_gitignore_patterns(tree):
+    tree.join('a', 'legacy', 'z.py').write("bot.ban(member)", ensure=True)
+    tree.join('a', 'b.py').write("bot.ban(member)")
+
+    # Anchored to the directory walked, and directories only.
+    files = async2rewrite.collect_files(str(tree), exclude=['/legacy', 'b/'])
+    assert relative(tree, files) == ['a/b.py', 'a/legacy/z.py', 'a/test_x.py', 'a/x.py', 'top.py']
+
+    files = async2rewrite.collect_files(str(tree), exclude=['a/**/*.py'])
+    assert relative(tree, files) == ['legacy/old.py', 'top.py']
+
+
+def test_include(tree):
+    files = async2rewrite.collect_files(str(tree), include=['a/*'])
+    assert relative(tree, files) == ['a/b/y.py', 'a/test_x.py', 'a/x.py']
+
+
+def test_explicit_files(tree):
+    files = [str(tree.join('top.py')), str(tree.join('a', 'test_x.py'))]
+    assert relative(tree, async2rewrite.collect_files(*files, exclude=['test_*'])) == ['top.py']
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='needs symlinks')
+def test_symlink_cycle(tree):
+    os.symlink(str(tree), str(tree.join('a', 'b', 'loop')))
+    assert relative(tree, async2rewrite.collect_files(str(tree))) == [
+        'a/b/y.py', 'a/test_x.py', 'a/x.py', 'legacy/old.py', 'top.py']
+
+
+def test_iter_files_exclude(tree):
+    results = dict(async2rewrite.iter_files(str(tree), exclude=['a', 'legacy']))
+    assert results == {str(tree.join('top.py')): "member.ban()"}
@@ -0,0 +1,92 @@
+import os
+import json
+import socket
+import stat
+import threading
+
+import pytest
+
+from async2rewrite.daemon import DaemonClient, DaemonError, DaemonServer, parse_address, token_path
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='needs unix sockets')
+
+
+@pytest.fixture
+def daemon(tmpdir):
+    server = DaemonServer(str(tmpdir.join('d.sock')), workers=1)
+    server.bind()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield DaemonClient(server.address)
+    server.server.shutdown()
+    thread.join()
+
+
+def test_parse_address():
+    assert parse_address('127.0.0.1:8657') == ('127.0.0.1', 8657)
+    assert parse_address('localhost:8657') == ('localhost', 8657)
+    assert parse_address('/tmp/a2r.sock') == '/tmp/a2r.sock'
+    with pytest.raises(DaemonError):
+        parse_address('0.0.0.0:8657')
+
+
+def test_daemon_needs_token(daemon):
+    assert stat.S_IMODE(os.stat(daemon.address).st_mode) & 0o077 == 0
+    assert stat.S_IMODE(os.stat(token_path(daemon.address)).st_mode) & 0o077 == 0
+
+    with daemon.connect() as sock, sock.makefile('rb') as responses:
+        sock.sendall(json.dumps({'op': 'ping', 'token': 'guess'}).encode('utf-8') + b'\n')
+        assert 'error' in json.loads(responses.readline().decode('utf-8'))
+
+
+def test_daemon_text(daemon):
+    assert daemon.ping()
+    assert daemon.from_text("bot.ban(member)") == "member.ban()"
+    with pytest.raises(DaemonError):
+        daemon.from_text("bot.ban(member:")
+
+
+def test_daemon_files(daemon, tmpdir):
+    tmpdir.mkdir('bots').join('a.py').write("bot.kick(member)")
+    tmpdir.join('b.py').write("bot.ban(member:")
+
+    cwd = os.getcwd()
+    os.chdir(str(tmpdir))
+    try:
+        results = list(daemon.iter_files('bots', 'b.py', return_exceptions=True))
+    finally:
+        os.chdir(cwd)
+
+    assert [path for path, _ in results] == ['bots/a.py', 'b.py']
+    assert results[0][1] == "member.kick()"
+    assert isinstance(results[1][1], DaemonError)
+
+
+def test_daemon_diagnostics(daemon, tmpdir):
+    tmpdir.join('a.py').write("bot.delete_messages(messages)")
+
+    cwd = os.getcwd()
+    os.chdir(str(tmpdir))
+    try:
+        [(path, (result, found))] = daemon.iter_files('a.py', diagnostics=True)
+    finally:
+        os.chdir(cwd)
+
+    assert result == "bot.delete_messages(messages)"
+    assert [(d.code, d.file, d.line, d.col) for d in found] == [('delete_messages', 'a.py', 1, 0)]
+
+
+def test_daemon_shutdown(tmpdir):
+    server = DaemonServer(str(tmpdir.join('d.sock')), workers=1)
+    server.bind()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    client = DaemonClient(server.address)
+    client.shutdown()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert not tmpdir.join('d.sock').check()
+    assert not tmpdir.join('d.sock.token').check()
+    assert not client.ping()
@@ -0,0 +1,48 @@
+import warnings
+
+import async2rewrite
+from async2rewrite.cache import ConversionCache
+from async2rewrite.transformers import Diagnostic
+
+CODE = "x = 1\nbot.delete_messages(messages)"
+
+
+def test_diagnostics_are_records():
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        result, found = async2rewrite.from_text(CODE, diagnostics=True)
+
+    assert not caught
+    assert result == "x = 1\nbot.delete_messages(messages)"
+    assert found == [Diagnostic('delete_messages', async2rewrite.warning_messages['delete_messages'], None, 2, 0)]
+
+
+def test_diagnostics_default_to_warnings():
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        async2rewrite.from_text(CODE)
+
+    assert [str(w.message) for w in caught] == [async2rewrite.warning_messages['delete_messages']]
+
+
+def test_diagnostics_name_the_file(tmpdir):
+    source = tmpdir.join('bot.py')
+    source.write(CODE)
+
+    _, found = async2rewrite.process_file(str(source), diagnostics=True)
+    assert [(d.file, d.line) for d in found] == [(str(source), 2)]
+
+
+def test_diagnostics_are_cached(tmpdir):
+    cache = ConversionCache(str(tmpdir.join('cache')))
+    first, second = tmpdir.join('a.py'), tmpdir.join('b.py')
+    first.write(CODE)
+    second.write(CODE)
+
+    assert async2rewrite.process_file(str(first), cache=cache, diagnostics=True)[1][0].file == str(first)
+
+    # The second file is a cache hit, and still gets its own name.
+    _, found = async2rewrite.process_file(str(second), cache=cache, diagnostics=True)
+    assert len(list(cache.entries())) == 1
+    assert found == [Diagnostic('delete_messages', async2rewrite.warning_messages['delete_messages'],
+                                str(second), 2, 0)]
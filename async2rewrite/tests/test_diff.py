@@ -0,0 +1,32 @@
+import async2rewrite
+from async2rewrite.diff import NO_NEWLINE, unified_diff
+
+
+def test_unified_diff():
+    original = "import discord\n\nbot.ban(member)\n"
+    converted = async2rewrite.from_text(original) + "\n"
+    assert list(unified_diff(original, converted, 'bot.py')) == [
+        '--- a/bot.py\n',
+        '+++ b/bot.py\n',
+        '@@ -1,3 +1,2 @@\n',
+        ' import discord\n',
+        '-\n',
+        '-bot.ban(member)\n',
+        '+member.ban()\n',
+    ]
+
+
+def test_unified_diff_context():
+    original = ''.join('line_{}\n'.format(n) for n in range(10))
+    converted = original.replace('line_5', 'changed')
+    lines = list(unified_diff(original, converted, 'bot.py', context=1))
+    assert lines[2:] == ['@@ -5,3 +5,3 @@\n', ' line_4\n', '-line_5\n', '+changed\n', ' line_6\n']
+
+
+def test_unified_diff_no_newline():
+    lines = list(unified_diff("bot.ban(member)", "member.ban()", 'bot.py'))
+    assert lines[3:] == ['-bot.ban(member)\n', NO_NEWLINE, '+member.ban()\n', NO_NEWLINE]
+
+
+def test_unified_diff_unchanged():
+    assert list(unified_diff("x = 1\n", "x = 1\n", 'bot.py')) == []
@@ -1,4 +1,7 @@
+import pytest
+
 import async2rewrite
+from async2rewrite.main import check_syntax
 
 
 def test_remove_pass_context_true():
@@ -34,3 +37,31 @@ def test_shortcut_channel():
 def test_shortcut_me():
     converted_code = async2rewrite.from_text("ctx.message.server.me")
     assert converted_code == "ctx.me"
+
+
+def test_shortcut_self_ctx():
+    converted_code = async2rewrite.from_text("self.ctx.message.channel")
+    assert converted_code == "self.ctx.channel"
+
+
+def test_shortcut_keeps_other_names():
+    converted_code = async2rewrite.from_text("other.message.author")
+    assert converted_code == "other.message.author"
+
+
+def test_validate_returns_same_code():
+    code = "ctx.message.author"
+    assert async2rewrite.from_text(code, validate=False) == async2rewrite.from_text(code)
+
+
+def test_invalid_output_raises():
+    # The limit is passed twice, so the converted call repeats a keyword.
+    code = "client.logs_from(channel, n, limit=m)"
+    with pytest.raises(SyntaxError):
+        async2rewrite.from_text(code)
+    assert async2rewrite.from_text(code, validate=False) == "channel.history(limit=m, limit=n)"
+
+
+def test_repeated_keyword_raises():
+    with pytest.raises(SyntaxError):
+        check_syntax("f(a=b, a=c)")
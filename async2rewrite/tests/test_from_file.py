@@ -0,0 +1,40 @@
+import async2rewrite
+import pytest
+
+
+def write_files(tmpdir, sources):
+    for name, source in sources.items():
+        tmpdir.join(name).write(source)
+    return [str(tmpdir.join(name)) for name in sorted(sources)]
+
+
+def test_from_file_workers_matches_serial(tmpdir):
+    paths = write_files(tmpdir, {'a.py': "bot.ban(member)", 'b.py': "bot.kick(member)",
+                                 'c.py': "bot.get_bans(server)"})
+    serial = async2rewrite.from_file(*paths)
+    parallel = async2rewrite.from_file(*paths, workers=2)
+    assert parallel == serial
+    assert list(parallel) == paths
+
+
+def test_from_file_workers_errors_per_file(tmpdir):
+    paths = write_files(tmpdir, {'a.py': "bot.ban(member)", 'b.py': "bot.ban(member:"})
+    with pytest.raises(async2rewrite.ConversionError) as info:
+        async2rewrite.from_file(*paths, workers=2)
+    assert list(info.value.errors) == [paths[1]]
+    assert isinstance(info.value.errors[paths[1]], SyntaxError)
+    assert info.value.results == {paths[0]: "member.ban()"}
+
+
+def test_iter_files_streams_in_order(tmpdir):
+    paths = write_files(tmpdir, {'a.py': "bot.ban(member)", 'b.py': "bot.kick(member)"})
+    results = async2rewrite.iter_files(*paths)
+    assert next(results) == (paths[0], "member.ban()")
+    assert next(results) == (paths[1], "member.kick()")
+
+
+def test_iter_files_return_exceptions(tmpdir):
+    paths = write_files(tmpdir, {'a.py': "bot.ban(member:", 'b.py': "bot.kick(member)"})
+    results = list(async2rewrite.iter_files(*paths, return_exceptions=True))
+    assert isinstance(results[0][1], SyntaxError)
+    assert results[1] == (paths[1], "member.kick()")
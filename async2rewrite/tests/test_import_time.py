@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# Milliseconds `python -m async2rewrite --print` may spend importing modules,
+# on top of what the interpreter imports at startup anyway. Timings depend on
+# the machine, so the budget is only checked with ASYNC2REWRITE_IMPORT_BUDGET=1.
+IMPORT_BUDGET_MS = 75
+
+# Only needed by the code paths that use them, never just to start up.
+LAZY_MODULES = ['asyncio', 'concurrent.futures.process', 'tkinter', 'pygments', 'astunparse_noparen',
+                'async2rewrite.analyzer', 'async2rewrite.patch', 'async2rewrite.daemon', 'async2rewrite.split',
+                'async2rewrite.aio', 'application.core', 'subprocess']
+
+
+def import_times(*args, cwd):
+    """Map each top-level import of a python run to its cumulative time in microseconds."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    output = subprocess.run([sys.executable, '-X', 'importtime'] + list(args), cwd=cwd, env=env,
+                            stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, universal_newlines=True).stderr
+
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented after the separator's space.
+        times[name[1:].rstrip()] = int(cumulative)
+    return times
+
+
+def test_submodules_from_package(tmpdir):
+    code = "import async2rewrite; async2rewrite.transformers.DiscordTransformer; async2rewrite.main.get_result"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    subprocess.run([sys.executable, '-c', code], cwd=str(tmpdir), env=env, check=True)
+
+
+def test_cli_imports_lazily(tmpdir):
+    imported = [name.strip() for name in import_times('-m', 'async2rewrite', '--print', cwd=str(tmpdir))]
+    assert [module for module in LAZY_MODULES if module in imported] == []
+
+
+@pytest.mark.skipif(not os.environ.get('ASYNC2REWRITE_IMPORT_BUDGET'), reason='set ASYNC2REWRITE_IMPORT_BUDGET=1')
+def test_cli_import_budget(tmpdir):
+    startup = import_times('-c', 'pass', cwd=str(tmpdir))
+
+    best = None
+    for _ in range(3):
+        times = import_times('-m', 'async2rewrite', '--print', cwd=str(tmpdir))
+        total = sum(time for name, time in times.items() if not name.startswith(' ') and name not in startup)
+        best = total if best is None else min(best, total)
+
+    assert best / 1000 < IMPORT_BUDGET_MS
@@ -0,0 +1,77 @@
+import os
+
+from async2rewrite.manifest import Journal, Manifest
+
+
+def test_manifest_tracks_changes(tmpdir):
+    source = tmpdir.join('bot.py')
+    output = tmpdir.join('bot.py.a2r.py')
+    source.write("bot.ban(member)")
+    output.write("member.ban()")
+
+    manifest = Manifest(str(tmpdir.join('manifest.json')))
+    assert not manifest.is_current(str(source), [str(output)])
+
+    manifest.record(str(source), [str(output)], "member.ban()")
+    manifest.save()
+
+    manifest = Manifest(str(tmpdir.join('manifest.json')))
+    assert manifest.is_current(str(source), [str(output)])
+
+    # Touching without changing the contents keeps the file current.
+    stat = os.stat(str(source))
+    os.utime(str(source), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert manifest.is_current(str(source), [str(output)])
+
+    source.write("bot.kick(member)")
+    assert not manifest.is_current(str(source), [str(output)])
+
+
+def test_manifest_missing_output(tmpdir):
+    source = tmpdir.join('bot.py')
+    source.write("bot.ban(member)")
+
+    manifest = Manifest(str(tmpdir.join('manifest.json')))
+    manifest.record(str(source), [str(tmpdir.join('bot.py.a2r.py'))], "member.ban()")
+    assert not manifest.is_current(str(source), [str(tmpdir.join('bot.py.a2r.py'))])
+
+
+def test_journal_resume(tmpdir):
+    path = str(tmpdir.join('journal.jsonl'))
+    converted, skipped, failed = tmpdir.join('a.py'), tmpdir.join('b.py'), tmpdir.join('c.py')
+    for source in (converted, skipped, failed):
+        source.write("bot.ban(member)")
+
+    journal = Journal(path)
+    journal.record(str(converted), 'ok')
+    journal.record(str(skipped), 'skipped')
+    journal.record(str(failed), 'failed', 'SyntaxError: invalid syntax')
+    journal.close()
+
+    # A run killed while writing a line leaves half of it behind.
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"path": ')
+
+    journal = Journal(path, resume=True)
+    assert journal.is_done(str(converted)) and journal.is_done(str(skipped))
+    assert not journal.is_done(str(failed))
+
+    converted.write("bot.kick(member)")
+    assert not journal.is_done(str(converted))
+    journal.close()
+
+
+def test_journal_starts_over(tmpdir):
+    path = str(tmpdir.join('journal.jsonl'))
+    source = tmpdir.join('a.py')
+    source.write("bot.ban(member)")
+
+    journal = Journal(path)
+    journal.record(str(source), 'ok')
+    journal.close()
+
+    journal = Journal(path)
+    assert not journal.is_done(str(source))
+    journal.close()
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
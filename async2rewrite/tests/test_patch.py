@@ -0,0 +1,59 @@
+import ast
+import sys
+
+import pytest
+
+import async2rewrite
+from async2rewrite import patch
+
+# Edited regions are only located on Python 3.8+, which has end positions.
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 8), reason='requires end positions')
+
+
+def test_patch_keeps_formatting_and_comments():
+    code = ("x = { 'a' : 1 }  # data\n"
+            "await client.send_message(channel,  content)  # send\n")
+    converted_code = async2rewrite.from_text(code, backend='patch')
+    assert converted_code == ("x = { 'a' : 1 }  # data\n"
+                              "await channel.send(content)  # send\n")
+
+
+# Before 3.9 regions are rendered by astunparse_noparen, which writes strings differently.
+@pytest.mark.skipif(sys.version_info < (3, 9), reason='requires ast.unparse')
+def test_patch_string_arguments():
+    code = "await client.send_message(channel, 'hi')  # greet\n"
+    converted_code = async2rewrite.from_text(code, backend='patch')
+    assert converted_code == "await channel.send('hi')  # greet\n"
+
+
+def test_patch_nested_edits():
+    code = "bot.add_roles(server.owner,   role)\n"
+    converted_code = async2rewrite.from_text(code, backend='patch')
+    assert converted_code == "guild.owner.add_roles(role)\n"
+
+
+def test_patch_function_header():
+    code = ("@bot.command(pass_context=True)\n"
+            "async def info(self):  # keep\n"
+            "    return  ctx.message.author\n")
+    converted_code = async2rewrite.from_text(code, backend='patch')
+    assert converted_code == ("@bot.command()\n"
+                              "async def info(self, ctx):  # keep\n"
+                              "    return  ctx.author\n")
+
+
+def test_patch_non_ascii_columns():
+    code = "é = 'ü'; x = ctx.message.channel\n"
+    converted_code = async2rewrite.from_text(code, backend='patch')
+    assert converted_code == "é = 'ü'; x = ctx.channel\n"
+
+
+def test_render_failure_is_patch_error(monkeypatch):
+    def unparse(node):
+        raise AttributeError('no renderer')
+
+    monkeypatch.setattr(patch, 'unparse', unparse)
+    code = "x = y\n"
+    tree = ast.parse(code)
+    with pytest.raises(patch.PatchError):
+        patch.patch_source(code, tree, [tree.body[0].value])
@@ -0,0 +1,80 @@
+import ast
+
+import async2rewrite
+from async2rewrite.main import mark_lines
+from async2rewrite.transformers import DiscordTransformer
+
+
+def test_no_triggers_returned_unchanged():
+    code = "import json\n\ndef load(path):\n    return json.load(open(path))  # banner\n"
+    assert not async2rewrite.needs_conversion(code)
+    assert async2rewrite.from_text(code) == code
+
+
+def test_trigger_inside_longer_name():
+    assert not async2rewrite.needs_conversion("urban_games = kickstart()")
+
+
+def test_triggers_detected():
+    assert async2rewrite.needs_conversion("bot.ban(member)")
+    assert async2rewrite.needs_conversion("x = message.server")
+    assert async2rewrite.needs_conversion("x = '84319995256905728'")
+    assert async2rewrite.needs_conversion("@bot.command()\nasync def ping(): pass")
+
+
+def test_prefilter_disabled():
+    code = "x  =  y"
+    assert async2rewrite.from_text(code, prefilter=False) == code
+
+
+def test_mark_lines():
+    code = "import json\nx = message.server\n\nasync def f(): pass\n"
+    assert mark_lines(code) == [0, 0, 1, 1, 2, 2]
+
+
+def test_unmarked_statements_skipped():
+    tree = ast.parse("x = message.server\ny = message.server")
+    transformer = DiscordTransformer()
+    transformer.marks = [0, 0, 1]
+    transformer.generic_visit(tree)
+
+    assert [statement.value.attr for statement in tree.body] == ['server', 'guild']
+
+
+def test_statement_ends_without_end_positions():
+    # What parsing looks like before Python 3.8.
+    code = "if a:\n    x = b; y = c\n    z = d\nv = e\nw = message.server\n"
+    tree = ast.parse(code)
+    for node in ast.walk(tree):
+        node.end_lineno = None
+
+    transformer = DiscordTransformer()
+    transformer.marks = mark_lines(code)
+    transformer.ends = {}
+    transformer.find_ends(tree)
+    transformer.find_ends(tree.body[0])
+
+    # A statement may end on the line the next one starts on, after a semicolon.
+    assert [transformer.ends[id(node)] for node in tree.body[0].body + tree.body] == [2, 3, 4, 4, 5, 6]
+    assert not transformer.may_change(tree.body[0])
+
+    transformer.ends = {}
+    transformer.generic_visit(tree)
+    assert tree.body[2].value.attr == 'guild'
+
+
+def test_decorators_are_marked():
+    code = "@server_check\ndef f(): pass"
+    transformer = DiscordTransformer()
+    transformer.marks = mark_lines(code)
+    assert transformer.may_change(ast.parse(code).body[0])
+
+
+def test_skipping_keeps_output():
+    code = ("def total(values):\n"
+            "    return sum(x * x for x in values)\n"
+            "\n"
+            "@bot.command()\n"
+            "async def count(ctx):\n"
+            "    await bot.say(total(ctx.message.server.members))\n")
+    assert async2rewrite.from_text(code) == async2rewrite.from_text(code, prefilter=False)
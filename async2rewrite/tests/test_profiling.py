@@ -0,0 +1,61 @@
+import ast
+
+import async2rewrite
+from async2rewrite.profiling import ProfilingTransformer, RuleProfile, StageTimer
+
+
+def test_profile_stages():
+    result, timer = async2rewrite.from_text("bot.ban(member)", profile=True, validate=True)
+    assert result == "member.ban()"
+    assert list(timer.stages) == ['prefilter', 'snowflakes', 'parse', 'transform', 'unparse', 'validate']
+    assert timer.total == sum(timer.stages.values())
+
+
+def test_profile_prefiltered():
+    result, timer = async2rewrite.from_text("x = y", profile=True)
+    assert result == "x = y"
+    assert list(timer.stages) == ['prefilter']
+
+
+def test_profile_adds_to_timer():
+    timer = StageTimer()
+    async2rewrite.from_text("bot.ban(member)", profile=timer)
+    first = timer.stages['parse']
+    async2rewrite.from_text("bot.kick(member)", profile=timer)
+    assert timer.stages['parse'] > first
+
+
+def test_profile_file(tmpdir):
+    source = tmpdir.join('bot.py')
+    source.write("bot.ban(member)")
+    result, timer = async2rewrite.process_file(str(source), profile=True, cache=str(tmpdir.join('cache')))
+    assert result == "member.ban()"
+    assert 'read' in timer.stages
+    assert not tmpdir.join('cache').check()
+
+
+def test_profile_rules():
+    code = "bot.ban(member)\nbot.kick(member)\nx.edited_timestamp"
+    result, timer = async2rewrite.from_text(code, profile_rules=True)
+    assert result == async2rewrite.from_text(code)
+    assert timer.rules['easy_statefuls'].examined == timer.rules['easy_statefuls'].rewritten == 2
+    assert timer.rules['to_edited_at'].rewritten == 1
+    assert timer.rules['to_edited_at'].examined == 3
+    assert 'to_messageable' not in timer.rules
+
+
+def test_rule_profile_matches_changes():
+    code = "async def on_message(message):\n    await client.send_message(message.channel, server)\n"
+    transformer = ProfilingTransformer()
+    transformer.generic_visit(ast.parse(code))
+    assert transformer.changes == sum(stats.rewritten for _, stats in transformer.profile.most_expensive())
+
+
+def test_rule_profile_update():
+    first = StageTimer(RuleProfile())
+    first.rules.record('easy_statefuls', True, 1.0)
+    second = StageTimer()
+    second.update(first)
+    second.update(first)
+    assert second.rules['easy_statefuls'].examined == 2
+    assert second.rules['easy_statefuls'].seconds == 2.0
@@ -1,4 +1,5 @@
 import async2rewrite
+from async2rewrite import transformers
 
 
 def test_messageserver_to_messageguild():
@@ -19,3 +20,20 @@ def test_createserver_to_createguild():
 def test_manageserver_to_manageguild():
     converted_code = async2rewrite.from_text("perms.manage_server")
     assert converted_code == "perms.manage_guild"
+
+
+def test_guild_name_cache():
+    assert transformers.guild_name("message") == "message"
+    assert "message" not in transformers.guild_names
+
+    assert transformers.guild_name("ServerRole_server") == "GuildRole_guild"
+    assert transformers.guild_names["ServerRole_server"] == "GuildRole_guild"
+
+
+def test_guild_name_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(transformers, 'guild_names', {})
+    monkeypatch.setattr(transformers, 'guild_names_limit', 10)
+
+    for n in range(25):
+        assert transformers.guild_name("server_{}".format(n)) == "guild_{}".format(n)
+        assert len(transformers.guild_names) <= 10
@@ -0,0 +1,43 @@
+import async2rewrite
+from async2rewrite.split import split_source
+
+COMMAND = '''
+
+@bot.command()
+async def ban_{0}(ctx, member):
+    await bot.ban(member)
+    await bot.say(member.server)
+'''
+
+CODE = "import discord\n" + ''.join(COMMAND.format(n) for n in range(20)) + "\n\nbot.delete_messages(messages)\n"
+
+
+def test_split_source():
+    groups = split_source(CODE, 10)
+
+    assert len(groups) > 1
+    assert ''.join(source for _, source in groups) == CODE
+    for offset, source in groups[1:]:
+        assert source.startswith('@bot.command()')
+        assert CODE.splitlines()[offset] == '@bot.command()'
+
+
+def test_split_matches_whole_module():
+    whole = async2rewrite.from_text(CODE, diagnostics=True)
+    assert async2rewrite.from_text(CODE, split=10, diagnostics=True) == whole
+    assert whole[1][0].line == CODE.count('\n')
+
+
+def test_bad_split_falls_back():
+    # A blank line between a decorator and its function splits them up.
+    code = CODE.replace("@bot.command()\n", "@bot.command()\n\n")
+    assert async2rewrite.from_text(code, split=1) == async2rewrite.from_text(code)
+
+
+def test_split_in_pool(tmpdir):
+    tmpdir.join('bot.py').write(CODE)
+    tmpdir.join('small.py').write("bot.kick(member)")
+
+    results = dict(async2rewrite.iter_files(str(tmpdir), workers=2, split=10))
+    assert results[str(tmpdir.join('bot.py'))] == async2rewrite.from_text(CODE)
+    assert results[str(tmpdir.join('small.py'))] == "member.kick()"
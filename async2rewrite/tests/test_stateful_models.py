@@ -132,6 +132,11 @@ def test_get_all_emojis():
     assert converted_code == "bot.emojis"
 
 
+def test_get_all_emojis_awaited():
+    converted_code = async2rewrite.from_text("for emoji in await bot.get_all_emojis():\n    pass")
+    assert converted_code == "for emoji in bot.emojis:\n    pass"
+
+
 def test_get_bans():
     converted_code = async2rewrite.from_text("bot.get_bans(guild)")
     assert converted_code == "guild.bans()"
@@ -0,0 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import async2rewrite
+
+
+def test_stats_per_call():
+    first = async2rewrite.from_text("bot.ban(member)", stats=True)
+    second = async2rewrite.from_text("bot.ban(member)", stats=True)
+    assert first == second == {'call_changes': 1}
+
+
+def test_stats_in_threads():
+    codes = ["bot.ban(member)\n" * n for n in range(1, 21)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda code: async2rewrite.from_text(code, stats=True), codes))
+    assert [result['call_changes'] for result in results] == list(range(1, 21))
@@ -1,5 +1,6 @@
-from collections import Counter
+from collections import Counter, namedtuple
 import warnings
+import sys
 import ast
 
 
@@ -13,7 +14,31 @@ easy_edits_list = ['edit_channel', 'edit_custom_emoji', 'edit_guild']
 
 removed_methods = ['wait_until_login', 'messages']
 
-stats_counter = Counter()
+property_methods = ['is_ready', 'is_default', 'is_closed']
+
+# Events whose signature or name changed, in discord.ext and in discord
+ext_events = ['on_command', 'on_command_completion', 'on_command_error']
+
+guild_events = ['on_voice_state_update', 'on_guild_emojis_update', 'on_member_ban', 'on_channel_delete',
+                'on_channel_create', 'on_channel_update']
+
+voice_methods = ['create_ffmpeg_player', 'create_ytdl_player', 'create_stream_player', 'play_audio']
+
+# Messages for the changes that have to be made by hand
+warning_messages = {
+    'delete_messages': "Cannot convert delete_messages. Must be done manually.",
+    'removed_method': "{} was removed in rewrite. Fix your code accordingly.",
+    'voice': "Voice implementation detected. This library does not convert voice.",
+    'wait_for_keyword': "wait_for keyword breaking change detected. Rewrite removes the {} keyword from wait_for.",
+    'wait_for_timeout': "wait_for timeout breaking change detected. Timeouts now raise asyncio.TimeoutError "
+                        "instead of returning None.",
+}
+
+# A change to be made by hand, ``code`` is its key in warning_messages
+Diagnostic = namedtuple('Diagnostic', 'code message file line col')
+
+# Context shortcuts, ctx.<via>.<attr> becomes ctx.<attr>
+ctx_shortcuts = {'author': 'message', 'channel': 'message', 'guild': 'message', 'me': 'guild'}
 
 
 def find_arg(call: ast.Call, arg_name: str, arg_pos: int=None):
@@ -30,8 +55,177 @@ def find_arg(call: ast.Call, arg_name: str, arg_pos: int=None):
     return found_value
 
 
+def emit_warnings(diagnostics):
+    """Report diagnostics through the warnings module."""
+    for diagnostic in diagnostics:
+        warnings.warn(diagnostic.message)
+
+
+# Renamed identifiers, shared by every conversion in the process. The same
+# names come up again and again, so each is only renamed once.
+guild_names = {}
+guild_names_limit = 8192
+
+
+def guild_name(name):
+    """Rename server identifiers to their guild counterparts."""
+    if 'erver' not in name:
+        return name
+
+    try:
+        return guild_names[name]
+    except KeyError:
+        pass
+
+    new_name = sys.intern(name.replace('server', 'guild').replace('Server', 'Guild'))
+    if len(guild_names) >= guild_names_limit:
+        guild_names.clear()
+    guild_names[name] = new_name
+    return new_name
+
+
+def index_call_rules(rules):
+    """Index an ordered rule table by the ``func.attr`` names it reacts to.
+
+    Returns a dict mapping each attribute name to a tuple of
+    ``(position, rule)`` pairs, sorted by position in the table.
+    """
+    index = {}
+    for position, (rule, attrs) in enumerate(rules):
+        for attr in attrs:
+            index.setdefault(attr, []).append((position, rule))
+
+    return {attr: tuple(rules) for attr, rules in index.items()}
+
+
+# Nodes with bodies of statements, see DiscordTransformer.find_ends.
+statement_parents = (ast.Module, ast.stmt, ast.excepthandler)
+
+
+def first_line(stmt):
+    """The line a statement starts on, decorators included."""
+    start = stmt.lineno
+    for decorator in getattr(stmt, 'decorator_list', ()):
+        start = min(start, decorator.lineno)
+    return start
+
+
 class DiscordTransformer(ast.NodeTransformer):
 
+    # Rules applied by visit_Call, in order, along with the attribute names
+    # they react to. Transforms at the end of the table change the node type.
+    call_rules = (
+        # this all has to do with the stateful model changes
+        ('to_messageable', ('say', 'send_message')),
+        ('easy_statefuls', tuple(easy_stateful_list)),
+        ('stateful_change_nickname', ('change_nickname',)),
+        ('stateful_create_channel', ('create_channel',)),
+        ('easy_deletes', tuple(easy_deletes_list)),
+        ('stateful_edit_message', ('edit_message',)),
+        ('easy_edits', tuple(easy_edits_list)),
+        ('stateful_edit_role', ('edit_role',)),
+        ('stateful_edit_channel_perms', ('edit_channel_permissions',)),
+        ('stateful_leave_server', ('leave_guild',)),
+        ('stateful_pin_message', ('pin_message', 'unpin_message')),
+        ('stateful_get_bans', ('get_bans',)),
+        ('stateful_pins_from', ('pins_from',)),
+        ('stateful_send_typing', ('send_typing',)),
+        ('stateful_wait_for', ('wait_for_message', 'wait_for_reaction')),
+        ('to_tuple_to_to_rgb', ('to_tuple',)),
+        ('channel_history', ('logs_from',)),
+        ('stateful_send_file', ('send_file',)),
+        ('stateful_delete_channel_perms', ('delete_channel_permissions',)),
+        ('stateful_delete_role', ('delete_role',)),
+        ('stateful_edit_profile', ('edit_profile',)),
+        ('stateful_invites_from', ('invites_from',)),
+        ('stateful_get_reaction_users', ('get_reaction_users',)),
+        ('stateful_move_channel', ('move_channel',)),
+        ('stateful_move_role', ('move_role',)),
+        ('stateful_move_member', ('move_member',)),
+        ('stateful_purge_from', ('purge_from',)),
+        ('stateful_replace_roles', ('replace_roles',)),
+        ('stateful_server_voice_state', ('guild_voice_state',)),
+        ('stateful_start_private_message', ('start_private_message',)),
+        ('warn_delete_messages', ('delete_messages',)),
+        ('warn_removed_methods', tuple(removed_methods)),
+        ('stateful_get_all_emojis', ('get_all_emojis',)),
+    )
+
+    call_index = index_call_rules(call_rules)
+
+    # Call rules that only report and never modify the call.
+    passive_rules = frozenset(['warn_delete_messages', 'warn_removed_methods'])
+
+    # Every rule, the call rules followed by those run by the other visitors.
+    rules = tuple(rule for rule, _ in call_rules) + (
+        'game_to_activity', 'attr_to_meth', 'server_to_guild', 'to_edited_at', 'detect_voice', 'to_activity',
+        'to_ctx_shortcut', 'ext_event_changes', 'ensure_ctx_var', 'remove_passcontext', 'event_changes',
+    )
+
+    def __init__(self):
+        super().__init__()
+
+        # Number of modifications made, zero means the tree is untouched.
+        self.changes = 0
+
+        # Nodes that were modified, in the order the edits were made.
+        self.edited = []
+
+        # Counts of the changes made, by kind, for this conversion only.
+        self.stats = Counter()
+
+        # Changes to be made by hand, as Diagnostic records.
+        self.diagnostics = []
+        self.filename = None
+
+        # Running counts of the lines a rule could apply to (see mark_lines),
+        # statements without any of those lines are skipped when set.
+        self.marks = None
+
+        # Before Python 3.8 statements have no end_lineno, so the last line
+        # each may end on is worked out from the statement after it.
+        self.ends = None if sys.version_info >= (3, 8) else {}
+
+    def visit(self, node):
+        if self.marks is not None and isinstance(node, ast.stmt) and not self.may_change(node):
+            return node
+
+        return super().visit(node)
+
+    def generic_visit(self, node):
+        if self.ends is not None and self.marks is not None and isinstance(node, statement_parents):
+            self.find_ends(node)
+
+        return super().generic_visit(node)
+
+    def find_ends(self, node):
+        """Record the last line each statement in the bodies of ``node`` may end on.
+
+        A statement ends before the next one starts (on the same line, after
+        a semicolon) and the last one ends with ``node``. That may be later
+        than the real end, which only means fewer statements are skipped.
+        """
+        end = self.ends.get(id(node), len(self.marks) - 1)
+        for field in ('body', 'handlers', 'orelse', 'finalbody'):
+            body = getattr(node, field, None)
+            if not isinstance(body, list):
+                continue
+
+            for stmt, following in zip(body, body[1:]):
+                self.ends[id(stmt)] = first_line(following)
+            if body:
+                self.ends[id(body[-1])] = end
+
+    def may_change(self, stmt):
+        """Whether a statement, decorators included, spans a marked line."""
+        end = getattr(stmt, 'end_lineno', None)
+        if end is None and self.ends is not None:
+            end = self.ends.get(id(stmt))
+        if end is None or end >= len(self.marks):
+            return True
+
+        return self.marks[end] != self.marks[first_line(stmt) - 1]
+
     def visit_FormattedValue(self, node):
         self.generic_visit(node)
 
@@ -42,7 +236,8 @@ class DiscordTransformer(ast.NodeTransformer):
 
     def visit_keyword(self, node):
         if node.arg == "game" and isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute):
-            node = self.game_to_activity(node)
+            node = ast.copy_location(self.game_to_activity(node), node)
+            self.touch(node)
 
         return node
 
@@ -57,54 +252,35 @@ class DiscordTransformer(ast.NodeTransformer):
         """Modify calls to their appropriate rewrite counterparts."""
         self.generic_visit(node)
 
-        # this all has to do with the stateful model changes
-        node = self.to_messageable(node)
-        node = self.easy_statefuls(node)
-        node = self.stateful_change_nickname(node)
-        node = self.stateful_create_channel(node)
-        node = self.easy_deletes(node)
-        node = self.stateful_edit_message(node)
-        node = self.easy_edits(node)
-        node = self.stateful_edit_role(node)
-        node = self.stateful_edit_channel_perms(node)
-        node = self.stateful_leave_server(node)
-        node = self.stateful_pin_message(node)
-        node = self.stateful_get_bans(node)
-        node = self.stateful_pins_from(node)
-        node = self.stateful_send_typing(node)
-        node = self.stateful_wait_for(node)
-        node = self.to_tuple_to_to_rgb(node)
-        node = self.channel_history(node)
-        node = self.stateful_send_file(node)
-        node = self.stateful_delete_channel_perms(node)
-        node = self.stateful_delete_role(node)
-        node = self.stateful_edit_profile(node)
-        node = self.stateful_invites_from(node)
-        node = self.stateful_get_reaction_users(node)
-        node = self.stateful_move_channel(node)
-        node = self.stateful_move_role(node)
-        node = self.stateful_move_member(node)
-        node = self.stateful_purge_from(node)
-        node = self.stateful_replace_roles(node)
-        node = self.stateful_server_voice_state(node)
-        node = self.stateful_start_private_message(node)
-
-        if isinstance(node.func, ast.Attribute) and node.func.attr == "delete_messages":
-            warnings.warn("Cannot convert delete_messages. Must be done manually.")
-
-        if isinstance(node.func, ast.Attribute) and node.func.attr in removed_methods:
-            warnings.warn("{} was removed in rewrite. Fix your code accordingly.".format(node.func.attr))
-
-        # Transforms below this comment change the node type.
-
-        node = self.stateful_get_all_emojis(node)
+        return self.apply_call_rules(node)
+
+    def apply_call_rules(self, node):
+        """Run the rules indexed under a call's attribute name, in table order.
+
+        A rule may rename the attribute or return a new node, so the index is
+        consulted again afterwards, only considering rules placed later in
+        ``call_rules``.
+        """
+        position = -1
+        while isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            for index, rule in self.call_index.get(node.func.attr, ()):
+                if index > position:
+                    break
+            else:
+                break
+
+            position = index
+            node = getattr(self, rule)(node)
+
+            if rule not in self.passive_rules:
+                self.touch(node)
 
         return node
 
     def visit_arg(self, node):
         self.generic_visit(node)
 
-        node.arg = node.arg.replace('server', 'guild').replace('Server', 'Guild')
+        node.arg = self.server_to_guild(node, node.arg)
         return node
 
     def visit_Attribute(self, node):
@@ -114,21 +290,29 @@ class DiscordTransformer(ast.NodeTransformer):
 
         self.detect_voice(node)
 
-        if node.attr == "game":
-            node.attr = "activity"
+        node = self.to_activity(node)
 
-        node.attr = node.attr.replace('server', 'guild').replace('Server', 'Guild')
+        node.attr = self.server_to_guild(node, node.attr)
+
+        node = self.to_ctx_shortcut(node)
         return node
 
     def visit_Name(self, node):
         self.generic_visit(node)
 
-        node.id = node.id.replace('server', 'guild').replace('Server', 'Guild')
+        node.id = self.server_to_guild(node, node.id)
         return node
 
     def visit_Await(self, node):
+        call = node.value
         self.generic_visit(node)
 
+        # A coroutine call turned into a property leaves nothing to await.
+        if isinstance(call, ast.Call) and node.value is call.func:
+            value = ast.copy_location(node.value, node)
+            self.touch(value)
+            return value
+
         return node
 
     def visit_AsyncFunctionDef(self, node):
@@ -139,7 +323,7 @@ class DiscordTransformer(ast.NodeTransformer):
         node = self.remove_passcontext(node)
         node = self.event_changes(node)
 
-        node.name = node.name.replace('server', 'guild').replace('Server', 'Guild')
+        node.name = self.server_to_guild(node, node.name)
 
         return node
 
@@ -148,16 +332,35 @@ class DiscordTransformer(ast.NodeTransformer):
 
         return node
 
+    def diagnose(self, node, code, *args):
+        """Record a change to be made by hand at ``node``."""
+        self.diagnostics.append(Diagnostic(code, warning_messages[code].format(*args), self.filename,
+                                           getattr(node, 'lineno', None), getattr(node, 'col_offset', None)))
+
+    def touch(self, node):
+        """Record that ``node`` was modified."""
+        self.changes += 1
+        self.edited.append(node)
+
+    def server_to_guild(self, node, name):
+        new_name = guild_name(name)
+        if new_name != name:
+            self.touch(node)
+
+        return new_name
+
     def ext_event_changes(self, coro):
         if coro.name == 'on_command' or coro.name == 'on_command_completion':
 
             coro.args.args = coro.args.args[1:]
-            stats_counter['coro_changes'] += 1
+            self.stats['coro_changes'] += 1
+            self.touch(coro)
             return coro
         elif coro.name == 'on_command_error':
 
             coro.args.args.reverse()
-            stats_counter['coro_changes'] += 1
+            self.stats['coro_changes'] += 1
+            self.touch(coro)
             return coro
 
         return coro
@@ -165,14 +368,17 @@ class DiscordTransformer(ast.NodeTransformer):
     def event_changes(self, coro):
         if coro.name == 'on_voice_state_update':
             coro.args.args.insert(0, ast.arg(arg='member', annotation=None))
+            self.touch(coro)
 
         elif coro.name in ['on_guild_emojis_update', 'on_member_ban']:
             coro.args.args.insert(0, ast.arg(arg='guild', annotation=None))
+            self.touch(coro)
 
         elif coro.name in ['on_channel_delete', 'on_channel_create', 'on_channel_update']:
             coro.name = coro.name.replace('on_channel', 'on_guild_channel')
+            self.touch(coro)
 
-        stats_counter['coro_changes'] += 1
+        self.stats['coro_changes'] += 1
         return coro
 
     def game_to_activity(self, node):
@@ -208,9 +414,8 @@ class DiscordTransformer(ast.NodeTransformer):
         return new_keyword
 
     def detect_voice(self, node):
-        if getattr(node, 'attr', None) in ["create_ffmpeg_player", "create_ytdl_player",
-                                           "create_stream_player", "play_audio"]:
-            warnings.warn("Voice implementation detected. This library does not convert voice.")
+        if getattr(node, 'attr', None) in voice_methods:
+            self.diagnose(node, 'voice')
 
         return node
 
@@ -230,31 +435,56 @@ class DiscordTransformer(ast.NodeTransformer):
 
         if not coro_args:
             coro.args.args.append(ast.arg(arg='ctx', annotation=None))
+            self.touch(coro)
         elif 'self' in coro_args and 'ctx' not in coro_args:
             coro.args.args.insert(1, ast.arg(arg='ctx', annotation=None))
+            self.touch(coro)
         elif 'self' not in coro_args and 'ctx' not in coro_args:
             coro.args.args.insert(0, ast.arg(arg='ctx', annotation=None))
+            self.touch(coro)
 
-        stats_counter['coro_changes'] += 1
+        self.stats['coro_changes'] += 1
 
         return coro
 
     def to_edited_at(self, attribute):
         if attribute.attr == 'edited_timestamp':
             attribute.attr = 'edited_at'
-            stats_counter['attribute_changes'] += 1
+            self.stats['attribute_changes'] += 1
+            self.touch(attribute)
+
+        return attribute
+
+    def to_activity(self, attribute):
+        if attribute.attr == 'game':
+            attribute.attr = 'activity'
+            self.touch(attribute)
+
+        return attribute
+
+    def to_ctx_shortcut(self, attribute):
+        via = attribute.value
+        if not isinstance(via, ast.Attribute) or via.attr != ctx_shortcuts.get(attribute.attr):
+            return attribute
+
+        ctx = via.value
+        if getattr(ctx, 'id', None) == 'ctx' or getattr(ctx, 'attr', None) == 'ctx':
+            attribute.value = ctx
+            self.stats['attribute_changes'] += 1
+            self.touch(attribute)
 
         return attribute
 
     def attr_to_meth(self, expr):
         if isinstance(expr.value, ast.Attribute):
-            if expr.value.attr in ['is_ready', 'is_default', 'is_closed']:
+            if expr.value.attr in property_methods:
                 call = ast.Call()
                 call.args = []
                 call.keywords = []
                 call.func = expr.value
                 expr.value = call
-                stats_counter['expr_changes'] += 1
+                self.stats['expr_changes'] += 1
+                self.touch(expr)
 
         return expr
 
@@ -267,20 +497,30 @@ class DiscordTransformer(ast.NodeTransformer):
                     continue
                 if kw.arg == 'pass_context':  # if the pass_context kwarg is set to True
                     d.keywords.remove(kw)
-                    stats_counter['coro_changes'] += 1
+                    self.stats['coro_changes'] += 1
+                    self.touch(d)
         return n
 
+    def warn_delete_messages(self, call):
+        if isinstance(call.func, ast.Attribute) and call.func.attr == "delete_messages":
+            self.diagnose(call, 'delete_messages')
+
+        return call
+
+    def warn_removed_methods(self, call):
+        if isinstance(call.func, ast.Attribute) and call.func.attr in removed_methods:
+            self.diagnose(call, 'removed_method', call.func.attr)
+
+        return call
+
     def stateful_get_all_emojis(self, call):
         if not isinstance(call.func, ast.Attribute):
             return call
         if call.func.attr != 'get_all_emojis':
             return call
 
-        new_expr = ast.Expr()
-        ast.copy_location(new_expr, call)
         call.func.attr = 'emojis'
-        new_expr.value = call.func
-        return new_expr
+        return ast.copy_location(call.func, call)
 
     def to_messageable(self, call):
         if not isinstance(call.func, ast.Attribute):
@@ -288,7 +528,7 @@ class DiscordTransformer(ast.NodeTransformer):
         if call.func.attr == 'say':
             call.func.value = ast.Name(id='ctx', ctx=ast.Load())
             call.func.attr = 'send'
-            stats_counter['call_changes'] += 1
+            self.stats['call_changes'] += 1
         elif call.func.attr == 'send_message':
             destination = find_arg(call, "destination", 0)
 
@@ -307,7 +547,7 @@ class DiscordTransformer(ast.NodeTransformer):
             newcall.keywords = call.keywords
 
             newcall = ast.copy_location(newcall, call)
-            stats_counter['call_changes'] += 1
+            self.stats['call_changes'] += 1
 
             return newcall
 
@@ -384,7 +624,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 message = call.args[0]
                 call.func.value = message
                 call.args = call.args[1:]
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def easy_deletes(self, call):
@@ -394,7 +634,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = to_delete
                 call.args = call.args[1:]
                 call.func.attr = 'delete'
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def easy_edits(self, call):
@@ -404,7 +644,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = to_edit
                 call.args = call.args[1:]
                 call.func.attr = 'edit'
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_delete_role(self, call):
@@ -449,7 +689,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 discord_file_call.keywords = [ast.keyword(arg='filename', value=filename.value)]
                 file_kw.value = discord_file_call
                 call.keywords.append(file_kw)
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
 
         return call
 
@@ -464,7 +704,7 @@ class DiscordTransformer(ast.NodeTransformer):
                     call.args = []
                 call.func.value = dest
                 call.func.attr = 'history'
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_change_nickname(self, call):
@@ -476,7 +716,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 nick = find_arg(call, "nickname", 1)
                 call.args = []
                 call.keywords = [ast.keyword(arg='nick', value=nick)]
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_pins_from(self, call):
@@ -486,7 +726,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = dest
                 call.func.attr = 'pins'
                 call.args = []
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_wait_for(self, call):
@@ -504,13 +744,11 @@ class DiscordTransformer(ast.NodeTransformer):
                 for kw in list(call.keywords):
                     if kw.arg != 'check' and kw.arg != 'timeout':
                         call.keywords.remove(kw)
-                        warnings.warn('wait_for keyword breaking change detected. Rewrite removes the {} keyword'
-                                      ' from wait_for.'.format(kw.arg))
+                        self.diagnose(call, 'wait_for_keyword', kw.arg)
                     elif kw.arg == 'timeout':
-                        warnings.warn('wait_for timeout breaking change detected. Timeouts now raise '
-                                      'asyncio.TimeoutError instead of returning None.')
+                        self.diagnose(call, 'wait_for_timeout')
 
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_edit_role(self, call):
@@ -520,7 +758,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = to_edit
                 call.args = call.args[2:]
                 call.func.attr = 'edit'
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_get_reaction_users(self, call):
@@ -546,7 +784,7 @@ class DiscordTransformer(ast.NodeTransformer):
         if isinstance(call.func, ast.Attribute):
             if call.func.attr == 'to_tuple':
                 call.func.attr = 'to_rgb'
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
 
         return call
 
@@ -557,7 +795,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = dest
                 call.args = call.args[1:]
                 call.func.attr = 'trigger_typing'
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_create_channel(self, call):
@@ -575,7 +813,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 if guild:
                     call.args = call.args[1:]
                 call.func.value = guild
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_edit_message(self, call):
@@ -588,7 +826,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.args = call.args[2:]
                 if content is not None:
                     call.keywords.append(ast.keyword(arg='content', value=content))
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_edit_profile(self, call):
@@ -606,7 +844,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = channel
                 target = find_arg(call, "target", 1)
                 call.args = [target]
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_delete_channel_perms(self, call):
@@ -618,7 +856,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.args = []
                 call.keywords = []
                 call.keywords.append(ast.keyword(arg='overwrite', value=ast.NameConstant(None)))
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
 
         return call
 
@@ -629,7 +867,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = server
                 call.func.attr = 'leave'
                 call.args = []
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_move_member(self, call):
@@ -656,7 +894,7 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = message
                 call.func.attr = 'unpin'
                 call.args = []
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
     def stateful_get_bans(self, call):
@@ -666,10 +904,24 @@ class DiscordTransformer(ast.NodeTransformer):
                 call.func.value = guild
                 call.func.attr = 'bans'
                 call.args = []
-                stats_counter['call_changes'] += 1
+                self.stats['call_changes'] += 1
         return call
 
 
+# Every name some rule reacts to, as an attribute, keyword, decorator or
+# function name. Code that mentions none of these (nor "server") comes out
+# of DiscordTransformer unchanged.
+trigger_names = frozenset(DiscordTransformer.call_index).union(
+    ['ctx', 'game', 'edited_timestamp', 'command', 'pass_context'],
+    property_methods, ext_events, guild_events, voice_methods)
+
+# Names that make a statement worth visiting. Every coroutine definition is
+# counted in the stats, so ``async`` is one of them.
+statement_names = trigger_names.union(['async'])
+
+
 def find_stats(ast):
-    DiscordTransformer().generic_visit(ast)
-    return stats_counter
+    transformer = DiscordTransformer()
+    transformer.generic_visit(ast)
+    emit_warnings(transformer.diagnostics)
+    return transformer.stats
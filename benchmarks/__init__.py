@@ -0,0 +1,7 @@
+"""
+
+Benchmarks for async2rewrite.
+
+Run a benchmark module directly, e.g. ``python -m benchmarks.dispatch``.
+
+"""
@@ -0,0 +1,202 @@
+"""Generates synthetic async-branch bots to benchmark conversions with.
+
+Every bot is built from the patterns DiscordTransformer handles (``send_message``,
+``logs_from``, ``wait_for_message``, ``pass_context`` commands, server
+attributes, renamed events, ...) mixed with ordinary code that no rule
+touches. Output is deterministic for a given seed.
+
+Usage: python -m benchmarks.corpus DIRECTORY [--files N] [--commands N] [--seed N]
+"""
+import argparse
+import os
+import random
+
+HEADER = '''import asyncio
+import json
+import logging
+
+import discord
+from discord.ext import commands
+
+logger = logging.getLogger(__name__)
+bot = commands.Bot(command_prefix='!')
+'''
+
+FOOTER = '''
+bot.run('token')
+'''
+
+# Templates for commands and events, formatted with ``n``, the command number.
+TEMPLATES = [
+    '''
+@bot.command(pass_context=True)
+async def say_{n}(ctx, *, text):
+    logger.info('%s said %s', ctx.message.author, text)
+    await bot.say(text)
+''',
+    '''
+@bot.command(pass_context=True)
+async def history_{n}(ctx, limit: int = 100):
+    counter = 0
+    tmp = await bot.send_message(ctx.message.channel, 'Calculating messages...')
+    async for log in bot.logs_from(ctx.message.channel, limit=limit):
+        if log.author == ctx.message.author:
+            counter += 1
+    await bot.edit_message(tmp, 'You have {{}} messages.'.format(counter))
+''',
+    '''
+@bot.command(pass_context=True)
+async def guess_{n}(ctx):
+    await bot.send_message(ctx.message.channel, 'Guess a number between 1 and 10.')
+    guess = await bot.wait_for_message(timeout=5.0, author=ctx.message.author,
+                                       check=lambda m: m.content.isdigit())
+    if guess is None:
+        return await bot.send_message(ctx.message.channel, 'Sorry, you took too long.')
+    await bot.send_message(ctx.message.channel, 'You guessed {{}}.'.format(guess.content))
+''',
+    '''
+@bot.command(pass_context=True)
+async def info_{n}(ctx):
+    server = ctx.message.server
+    embed = discord.Embed(title=server.name, description=str(server.id))
+    embed.add_field(name='Members', value=len(server.members))
+    embed.add_field(name='Owner', value=str(server.owner))
+    await bot.send_message(ctx.message.channel, embed=embed)
+''',
+    '''
+@bot.command(pass_context=True)
+async def role_{n}(ctx, member: discord.Member, *, name):
+    role = discord.utils.get(ctx.message.server.roles, name=name)
+    if role is None:
+        role = await bot.create_role(ctx.message.server, name=name)
+    await bot.add_roles(member, role)
+    await bot.add_reaction(ctx.message, '\\N{{OK HAND SIGN}}')
+''',
+    '''
+@bot.command(pass_context=True)
+async def clean_{n}(ctx, limit: int = 10):
+    deleted = await bot.purge_from(ctx.message.channel, limit=limit, check=lambda m: m.author == bot.user)
+    await bot.delete_message(ctx.message)
+    logger.debug('deleted %d messages', len(deleted))
+''',
+    '''
+@bot.command()
+async def status_{n}(*, name):
+    await bot.change_presence(game=discord.Game(name=name))
+    await bot.say('Now playing {{}}'.format(name))
+''',
+    '''
+@bot.command(pass_context=True)
+async def topic_{n}(ctx, *, topic):
+    await bot.edit_channel(ctx.message.channel, topic=topic)
+    await bot.send_typing(ctx.message.channel)
+    message = await bot.get_message(ctx.message.channel, ctx.message.id)
+    logger.info('edited at %s', message.edited_timestamp)
+''',
+    '''
+@bot.command(pass_context=True)
+async def kick_{n}(ctx, member: discord.Member, *, reason=None):
+    if not ctx.message.author.server_permissions.kick_members:
+        return await bot.say('You are not allowed to do that.')
+    await bot.kick(member)
+    await bot.send_message(member, 'You were kicked from {{}}: {{}}'.format(ctx.message.server.name, reason))
+''',
+    '''
+def parse_{n}(payload):
+    data = json.loads(payload.decode('utf-8'))
+    values = [int(x) for x in data.get('values', [])]
+    total = sum(map(abs, values)) + len(str(values)) + max(values or [0])
+    return {{key: value for key, value in data.items() if not key.startswith('_')}}, total
+''',
+    '''
+async def report_{n}(channel, entries):
+    lines = []
+    for index, entry in enumerate(sorted(entries, key=lambda e: e['time'])):
+        lines.append('{{:>3}}. {{}}'.format(index + 1, entry['name'].strip()))
+        await asyncio.sleep(0)
+    await bot.send_message(channel, '\\n'.join(lines) or 'Nothing to report.')
+''',
+]
+
+# Events, each defined at most once per bot.
+EVENTS = [
+    '''
+@bot.event
+async def on_ready():
+    print('Logged in as', bot.user.name, bot.user.id)
+    await bot.change_presence(game=discord.Game(name='!help'))
+''',
+    '''
+@bot.event
+async def on_member_join(member):
+    channel = member.server.default_channel
+    await bot.send_message(channel, 'Welcome {} to {}!'.format(member.mention, member.server.name))
+''',
+    '''
+@bot.event
+async def on_command_error(error, ctx):
+    if isinstance(error, commands.CommandNotFound):
+        return
+    await bot.send_message(ctx.message.channel, 'Error: {}'.format(error))
+''',
+    '''
+@bot.event
+async def on_channel_create(channel):
+    logger.info('channel %s created in %s', channel.name, channel.server.name)
+''',
+    '''
+@bot.event
+async def on_message(message):
+    if message.author.bot:
+        return
+    if message.content.startswith('!ping'):
+        await bot.send_message(message.channel, 'Pong!')
+    await bot.process_commands(message)
+''',
+]
+
+
+def generate_bot(commands=20, seed=0):
+    """Source of a bot with ``commands`` commands or helpers, and a few events."""
+    rng = random.Random(seed)
+    parts = [HEADER]
+    parts.extend(rng.sample(EVENTS, rng.randint(1, len(EVENTS))))
+    parts.extend(rng.choice(TEMPLATES).format(n=n) for n in range(commands))
+    parts.append(FOOTER)
+    return ''.join(parts)
+
+
+def generate_corpus(files=50, commands=20, seed=0):
+    """Yield ``(name, source)`` for ``files`` bots of around ``commands`` commands each."""
+    rng = random.Random(seed)
+    for n in range(files):
+        size = max(1, int(rng.gauss(commands, commands / 4)))
+        yield 'bot_{:04}.py'.format(n), generate_bot(size, seed=rng.getrandbits(32))
+
+
+def write_corpus(directory, files=50, commands=20, seed=0):
+    """Write a corpus into ``directory``, returning the paths written."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, source in generate_corpus(files, commands, seed):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory')
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--commands', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_corpus(args.directory, args.files, args.commands, args.seed)
+    print('wrote {} files to {}'.format(len(paths), args.directory))
+
+
+if __name__ == '__main__':
+    main()
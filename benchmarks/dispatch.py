@@ -0,0 +1,89 @@
+"""Times ``DiscordTransformer`` traversal with indexed call-rule dispatch
+against the previous behaviour of running every rule on every call.
+
+Usage: python -m benchmarks.dispatch [--repeat N] [--copies N]
+"""
+import argparse
+import ast
+import copy
+import os
+import time
+import warnings
+
+from async2rewrite.transformers import DiscordTransformer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Mostly calls that no rule reacts to, with a handful of async-branch calls,
+# which is what a typical bot module looks like.
+SNIPPET = '''
+async def handler_{n}(message, server):
+    data = json.loads(payload.decode('utf-8'))
+    values = [int(x) for x in data.get('values', [])]
+    total = sum(map(abs, values)) + len(str(values)) + max(values or [0])
+    logger.info('processed %s entries', len(values))
+    await asyncio.sleep(0.1)
+    result = helpers.compute(total, key=lambda v: v.lower().strip())
+    await client.send_message(message.channel, 'Total: {{}}'.format(total))
+    await client.add_reaction(message, '\\N{{OK HAND SIGN}}')
+    async for log in client.logs_from(message.channel, limit=10):
+        cache.setdefault(log.author.id, []).append(log.content.split())
+    return result
+'''
+
+
+class ChainedTransformer(DiscordTransformer):
+    """Runs every call rule on every call, as visit_Call did before the index."""
+
+    def __init__(self):
+        super().__init__()
+        self.chain = [getattr(self, rule) for rule, _ in self.call_rules]
+
+    def apply_call_rules(self, node):
+        for rule in self.chain:
+            node = rule(node)
+        return node
+
+
+def build_source(copies):
+    with open(os.path.join(ROOT, 'sample_code.py'), encoding='utf-8') as f:
+        sample = f.read()
+    return sample + ''.join(SNIPPET.format(n=n) for n in range(copies))
+
+
+def time_transformer(cls, tree, repeat):
+    best = None
+    for _ in range(repeat):
+        work = copy.deepcopy(tree)
+        start = time.perf_counter()
+        cls().generic_visit(work)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, work
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--copies', type=int, default=500)
+    args = parser.parse_args()
+
+    tree = ast.parse(build_source(args.copies))
+    nodes = sum(1 for _ in ast.walk(tree))
+    calls = sum(1 for n in ast.walk(tree) if isinstance(n, ast.Call))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        before, chained = time_transformer(ChainedTransformer, tree, args.repeat)
+        after, indexed = time_transformer(DiscordTransformer, tree, args.repeat)
+
+    assert ast.dump(chained) == ast.dump(indexed), 'indexed dispatch changed the output'
+
+    print('{} nodes, {} calls, best of {}'.format(nodes, calls, args.repeat))
+    for name, elapsed in (('chained', before), ('indexed', after)):
+        print('{:>8}: {:8.1f} ms  {:6.3f} us/node'.format(name, elapsed * 1e3, elapsed * 1e6 / nodes))
+    print('speedup: {:.2f}x'.format(before / after))
+
+
+if __name__ == '__main__':
+    main()
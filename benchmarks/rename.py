@@ -0,0 +1,107 @@
+"""Times the server to guild renaming of identifiers with the shared rename
+cache against renaming every identifier from scratch.
+
+Usage: python -m benchmarks.rename [--repeat N] [--files N] [--commands N]
+"""
+import argparse
+import ast
+import copy
+import time
+import warnings
+
+from async2rewrite import transformers
+from async2rewrite.transformers import DiscordTransformer
+
+from .corpus import generate_corpus
+
+
+def uncached_guild_name(name):
+    """guild_name as it was before the rename cache."""
+    return name.replace('server', 'guild').replace('Server', 'Guild')
+
+
+class UncachedTransformer(DiscordTransformer):
+    """Renames every identifier from scratch."""
+
+    def server_to_guild(self, node, name):
+        new_name = uncached_guild_name(name)
+        if new_name != name:
+            self.touch(node)
+
+        return new_name
+
+
+def identifiers(trees):
+    """Every identifier the transformer renames, in the order it visits them."""
+    names = []
+    for tree in trees:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                names.append(node.id)
+            elif isinstance(node, ast.Attribute):
+                names.append(node.attr)
+            elif isinstance(node, ast.arg):
+                names.append(node.arg)
+            elif isinstance(node, ast.AsyncFunctionDef):
+                names.append(node.name)
+    return names
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_transformer(cls, trees, repeat):
+    best = None
+    for _ in range(repeat):
+        work = copy.deepcopy(trees)
+        start = time.perf_counter()
+        for tree in work:
+            cls().generic_visit(tree)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, work
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--commands', type=int, default=20)
+    args = parser.parse_args()
+
+    trees = [ast.parse(source) for _, source in generate_corpus(args.files, args.commands)]
+    names = identifiers(trees)
+    nodes = sum(1 for tree in trees for _ in ast.walk(tree))
+
+    assert [transformers.guild_name(name) for name in names] == [uncached_guild_name(name) for name in names]
+
+    before = best_of(args.repeat, lambda: [uncached_guild_name(name) for name in names])
+    after = best_of(args.repeat, lambda: [transformers.guild_name(name) for name in names])
+
+    print('{} identifiers ({} distinct), best of {}'.format(len(names), len(set(names)), args.repeat))
+    for name, elapsed in (('uncached', before), ('cached', after)):
+        print('{:>9}: {:8.2f} ms  {:6.3f} us/identifier'.format(name, elapsed * 1e3, elapsed * 1e6 / len(names)))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        before, uncached = time_transformer(UncachedTransformer, trees, args.repeat)
+        after, cached = time_transformer(DiscordTransformer, trees, args.repeat)
+
+    assert [ast.dump(tree) for tree in uncached] == [ast.dump(tree) for tree in cached], \
+        'the rename cache changed the output'
+
+    print('{} nodes in {} files'.format(nodes, len(trees)))
+    for name, elapsed in (('uncached', before), ('cached', after)):
+        print('{:>9}: {:8.1f} ms  {:6.3f} us/node'.format(name, elapsed * 1e3, elapsed * 1e6 / nodes))
+    print('speedup: {:.2f}x'.format(before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Times DiscordTransformer traversal with statements that no rule could
+change skipped, against visiting every node, as the share of code that
+has nothing to do with discord grows.
+
+Usage: python -m benchmarks.skipping [--repeat N] [--commands N] [--helpers N]
+"""
+import argparse
+import ast
+import copy
+import time
+import warnings
+
+from async2rewrite.main import mark_lines
+from async2rewrite.transformers import DiscordTransformer
+
+from .corpus import generate_bot
+
+# A data-processing helper, formatted with ``n``, that no rule reacts to.
+HELPER = '''
+TABLE_{n} = {{
+    'alpha': [1, 2, 3, 4, 5, 6, 7, 8], 'beta': [9, 10, 11, 12, 13, 14, 15, 16],
+    'gamma': {{'x': 1.5, 'y': 2.5, 'z': (3, 4, 5)}}, 'delta': [[i * j for j in range(8)] for i in range(8)],
+}}
+
+
+def normalise_{n}(values, scale=1.0):
+    total = sum(abs(v) for v in values) or 1
+    mean = total / len(values)
+    spread = max(values) - min(values)
+    return [(v - mean) * scale / (spread or 1) for v in values if v is not None]
+'''
+
+
+def time_traversal(source, marked, repeat):
+    tree = ast.parse(source)
+    best = None
+    for _ in range(repeat):
+        work = copy.deepcopy(tree)
+        start = time.perf_counter()
+        transformer = DiscordTransformer()
+        if marked:
+            transformer.marks = mark_lines(source)
+        transformer.generic_visit(work)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, work
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--commands', type=int, default=50)
+    parser.add_argument('--helpers', type=int, default=200)
+    args = parser.parse_args()
+
+    bot = generate_bot(args.commands)
+
+    print('{} commands, best of {}'.format(args.commands, args.repeat))
+    for helpers in sorted({0, args.helpers // 4, args.helpers}):
+        source = bot + ''.join(HELPER.format(n=n) for n in range(helpers))
+        nodes = sum(1 for _ in ast.walk(ast.parse(source)))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            before, full = time_traversal(source, False, args.repeat)
+            after, marked = time_traversal(source, True, args.repeat)
+
+        assert ast.dump(full) == ast.dump(marked), 'skipping statements changed the output'
+
+        print('{:4} helpers, {:6} nodes: full {:8.1f} ms  marked {:8.1f} ms  speedup {:.2f}x'.format(
+            helpers, nodes, before * 1e3, after * 1e3, before / after))
+
+
+if __name__ == '__main__':
+    main()
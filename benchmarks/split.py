@@ -0,0 +1,74 @@
+"""Times converting one very large bot as a whole module, split into groups
+of top-level definitions, and split over a process pool, along with the
+peak memory each takes.
+
+Usage: python -m benchmarks.split [--commands N] [--lines N] [--jobs N] [--repeat N]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from async2rewrite.daemon import warm_up
+from async2rewrite.main import get_result
+from async2rewrite.split import submit_split
+
+from .corpus import generate_bot
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--commands', type=int, default=3000)
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    code = generate_bot(args.commands)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+
+        whole, expected = best_of(args.repeat, lambda: get_result(code))
+        split, result = best_of(args.repeat, lambda: get_result(code, split=args.lines))
+        assert result == expected, 'splitting changed the output'
+
+        with ProcessPoolExecutor(args.jobs) as executor:
+            # Start the workers before timing them.
+            list(executor.map(warm_up, range(args.jobs)))
+            pool, result = best_of(args.repeat, lambda: submit_split(executor, code, split=args.lines).result())
+        assert result == expected, 'splitting over the pool changed the output'
+
+        memory = {'whole': peak_memory(lambda: get_result(code)),
+                  'split': peak_memory(lambda: get_result(code, split=args.lines))}
+
+    print('{} lines in groups of {} lines, best of {}'.format(code.count('\n'), args.lines, args.repeat))
+    for name, elapsed in (('whole', whole), ('split', split), ('pool of {}'.format(args.jobs), pool)):
+        print('{:>12}: {:8.1f} ms  {:.2f}x'.format(name, elapsed * 1e3, whole / elapsed))
+    for name, peak in memory.items():
+        print('{:>12}: {:8.1f} MB peak'.format(name, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Measures from_text and from_file throughput on a synthetic corpus.
+
+Reports files/s and lines/s for each, best of ``--repeat`` runs, and
+saves the results as JSON so runs can be compared across releases.
+
+Usage: python -m benchmarks.throughput [--files N] [--commands N] [--repeat N]
+                                       [--jobs N] [--output FILE]
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import tempfile
+import time
+import warnings
+
+import async2rewrite
+from async2rewrite.cache import rules_version
+
+from .corpus import generate_corpus, write_corpus
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def rates(elapsed, files, lines):
+    return {'seconds': elapsed, 'files_per_second': files / elapsed, 'lines_per_second': lines / elapsed}
+
+
+def run(files=50, commands=20, seed=0, repeat=3, jobs=None):
+    """Time conversions of a generated corpus, returning the results as a dict."""
+    corpus = [source for _, source in generate_corpus(files, commands, seed)]
+    lines = sum(source.count('\n') for source in corpus)
+    results = {}
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+
+        results['from_text'] = rates(best_of(repeat, lambda: [async2rewrite.from_text(source)
+                                                             for source in corpus]), files, lines)
+
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus(directory, files, commands, seed)
+            results['from_file'] = rates(best_of(repeat, lambda: async2rewrite.from_file(directory)), files, lines)
+
+            if jobs is not None:
+                elapsed = best_of(repeat, lambda: async2rewrite.from_file(directory, workers=jobs))
+                results['from_file_jobs_{}'.format(jobs)] = rates(elapsed, files, lines)
+
+    return {
+        'version': async2rewrite.__version__,
+        'rules_version': rules_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'corpus': {'files': files, 'commands': commands, 'seed': seed, 'lines': lines},
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--commands', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='also time from_file with this many workers, 0 for one per CPU')
+    parser.add_argument('--output', default=None, help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    report = run(args.files, args.commands, args.seed, args.repeat, args.jobs)
+
+    corpus = report['corpus']
+    print('{} files, {} lines, best of {}'.format(corpus['files'], corpus['lines'], report['repeat']))
+    for name, result in report['results'].items():
+        print('{:>16}: {:8.1f} ms  {:8.1f} files/s  {:10.1f} lines/s'.format(
+            name, result['seconds'] * 1e3, result['files_per_second'], result['lines_per_second']))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print('results written to {}'.format(args.output), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()